@@ -0,0 +1,169 @@
+"""async_fetcher.py 并发获取多个产品的K线，限制并发数和请求频率，失败时退避重试"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pandas import DataFrame
+from utils.data_cache import data_cache
+from utils.enumeration_label import ProductType
+from config import do_logging
+from typing import AsyncIterator, Callable, NamedTuple, Optional
+
+import asyncio
+import datetime as dt
+import inspect
+import time
+
+logger = do_logging()
+
+
+class FetchResult(NamedTuple):
+    """单个产品的获取结果，失败时df_dict为None，error为最后一次的异常"""
+
+    product_code: str
+    df_dict: Optional[dict[str, DataFrame]]
+    error: Optional[Exception]
+    attempts: int
+
+
+class RateLimiter:
+    """按固定间隔放行请求，rate_per_second为None时不限速"""
+
+    def __init__(self, rate_per_second: Optional[float]) -> None:
+        self.interval = 1 / rate_per_second if rate_per_second else 0.0
+        self._next_time = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def wait(self) -> None:
+        if self.interval == 0.0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_time > now:
+                await asyncio.sleep(self._next_time - now)
+            self._next_time = max(now, self._next_time) + self.interval
+
+
+def _default_fetch(
+    product_code: str, today_date: dt.date, product_type: ProductType
+) -> dict[str, DataFrame]:
+    """默认通过dataPicker获取日K和周K"""
+    from utils import dataSource_picker as dp
+
+    return dp.dataPicker.product_source_picker(
+        product_code=product_code, today_date=today_date, product_type=product_type
+    )
+
+
+class KlineFetcher:
+    """
+    批量获取K线\n
+    fetch_func可以是普通函数或协程函数，参数为(product_code, today_date, product_type)，返回K线字典\n
+    普通函数在共用的线程池中执行，线程数等于concurrency，离线测试时可传入本地的桩函数
+    """
+
+    def __init__(
+        self,
+        fetch_func: Optional[Callable] = None,
+        concurrency: int = 8,
+        rate_per_second: Optional[float] = None,
+        retries: int = 3,
+        backoff_seconds: float = 0.5,
+    ) -> None:
+        self.fetch_func = fetch_func or _default_fetch
+        self.concurrency = concurrency
+        self.rate_per_second = rate_per_second
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def _fetch_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: RateLimiter,
+        product_code: str,
+        today_date: dt.date,
+        product_type: ProductType,
+    ) -> FetchResult:
+        async with semaphore:
+            for attempt in range(1, self.retries + 2):
+                await rate_limiter.wait()
+                try:
+                    if inspect.iscoroutinefunction(self.fetch_func):
+                        df_dict = await self.fetch_func(
+                            product_code, today_date, product_type
+                        )
+                    else:
+                        df_dict = await asyncio.get_running_loop().run_in_executor(
+                            self._executor,
+                            self.fetch_func,
+                            product_code,
+                            today_date,
+                            product_type,
+                        )
+                    return FetchResult(product_code, df_dict, None, attempt)
+                except Exception as e:
+                    if attempt > self.retries:
+                        logger.warning(f"获取{product_code}的K线失败\n>>>>{e}")
+                        return FetchResult(product_code, None, e, attempt)
+                    # 指数退避
+                    delay = self.backoff_seconds * 2 ** (attempt - 1)
+                    logger.debug(
+                        f"获取{product_code}的K线出错，{delay:.1f}秒后重试\n>>>>{e}"
+                    )
+                    await asyncio.sleep(delay)
+
+    async def fetch_stream(
+        self,
+        product_codes: list[str],
+        today_date: Optional[dt.date] = None,
+        product_type: ProductType = ProductType.Stock,
+    ) -> AsyncIterator[FetchResult]:
+        """并发获取，按完成顺序逐个返回结果"""
+        today_date = today_date or dt.date.today()
+        # 信号量和限速器绑定当前事件循环，每次调用重新创建
+        semaphore = asyncio.Semaphore(self.concurrency)
+        rate_limiter = RateLimiter(self.rate_per_second)
+        tasks = [
+            asyncio.create_task(
+                self._fetch_one(
+                    semaphore, rate_limiter, product_code, today_date, product_type
+                )
+            )
+            for product_code in product_codes
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+
+    def fetch_all(
+        self,
+        product_codes: list[str],
+        today_date: Optional[dt.date] = None,
+        product_type: ProductType = ProductType.Stock,
+        fill_cache: bool = True,
+    ) -> dict[str, FetchResult]:
+        """
+        同步接口，获取全部产品后按传入顺序返回\n
+        fill_cache为True时，成功的结果放入data_cache，后续分析不再重复获取
+        """
+        today_date = today_date or dt.date.today()
+
+        async def collect() -> dict[str, FetchResult]:
+            results = {}
+            async for result in self.fetch_stream(
+                product_codes, today_date, product_type
+            ):
+                results[result.product_code] = result
+                if fill_cache and result.df_dict is not None:
+                    data_cache.put_product_df_dict(
+                        result.product_code, today_date, product_type, result.df_dict
+                    )
+            return results
+
+        results = asyncio.run(collect())
+        failed = [code for code, result in results.items() if result.error is not None]
+        logger.info(
+            f"批量获取K线完成：共{len(product_codes)}个，失败{len(failed)}个"
+            + (f"\n>>>>{failed}" if failed else "")
+        )
+        return {code: results[code] for code in product_codes}
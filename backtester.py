@@ -0,0 +1,228 @@
+"""backtester.py 向量化回测，把策略的判断值（-1至1）转换为仓位，计算收益、回撤和换手"""
+
+from pandas import DataFrame
+from utils.kline_resampler import PERIOD_FREQ
+from typing import Hashable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# A股交易费用的默认值：佣金双向收取，印花税只在卖出时收取
+DEFAULT_FEE_RATE = 0.00025
+DEFAULT_STAMP_DUTY = 0.0005
+
+
+class VectorBacktester:
+    """
+    向量化回测\n
+    每一列判断值是一个策略，所有列在同一组收盘价上一次计算，没有逐根K线的循环\n
+    判断值在当日收盘后才能得到，按收盘价成交，仓位从下一根K线开始生效；\n
+    当日买入的仓位最早在下一根K线卖出，满足A股的T+1限制\n
+    sizing为"linear"时仓位等于判断值，为"sign"时只取判断值的方向，仓位为满仓、空仓（或满仓做空）\n
+    long_only为True时负的判断值视为空仓
+    """
+
+    def __init__(
+        self,
+        fee_rate: float = DEFAULT_FEE_RATE,
+        stamp_duty: float = DEFAULT_STAMP_DUTY,
+        sizing: str = "linear",
+        long_only: bool = True,
+        periods_per_year: int = 252,
+    ) -> None:
+        if sizing not in ("linear", "sign"):
+            raise ValueError(
+                f"不支持的仓位计算方式'{sizing}'，可选：['linear', 'sign']"
+            )
+        self.fee_rate = fee_rate
+        self.stamp_duty = stamp_duty
+        self.sizing = sizing
+        self.long_only = long_only
+        self.periods_per_year = periods_per_year
+
+    def position(self, signal: np.ndarray) -> np.ndarray:
+        """由判断值得到目标仓位，缺失的判断值视为空仓"""
+        signal = np.nan_to_num(np.asarray(signal, dtype=np.float64), nan=0.0)
+        target = np.sign(signal) if self.sizing == "sign" else signal
+        return np.clip(target, 0.0 if self.long_only else -1.0, 1.0)
+
+    def simulate(self, close: np.ndarray, signal: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        回测的核心计算，close为(n,)或(n, m)，signal为(n, m)，按列广播\n
+        返回逐根K线的仓位、换手、费用、净收益率和净值，形状均为(n, m)
+        """
+        close = np.asarray(close, dtype=np.float64)
+        if len(close) == 0:
+            raise ValueError("没有K线数据，无法回测！")
+        if close.ndim == 1:
+            close = close[:, None]
+        signal = np.asarray(signal, dtype=np.float64)
+        if signal.ndim == 1:
+            signal = signal[:, None]
+
+        # 停牌等收盘价缺失的K线沿用之前最后一个收盘价，收益为0，
+        # 复牌的K线相对停牌前的收盘价计算收益，停牌期间的涨跌不会丢失
+        last_valid = np.maximum.accumulate(
+            np.where(~np.isnan(close), np.arange(len(close))[:, None], 0), axis=0
+        )
+        filled_close = np.take_along_axis(close, last_valid, axis=0)
+        price_return = np.zeros(np.broadcast_shapes(close.shape, signal.shape))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_return[1:] = filled_close[1:] / filled_close[:-1] - 1
+        price_return[~np.isfinite(price_return)] = 0.0
+
+        target = self.position(signal)
+        # 收盘价缺失时无法成交，沿用前一根K线的仓位
+        if np.isnan(close).any():
+            tradable = np.broadcast_to(~np.isnan(close), target.shape)
+            last_tradable = np.maximum.accumulate(
+                np.where(tradable, np.arange(len(target))[:, None], 0), axis=0
+            )
+            target = np.where(
+                np.maximum.accumulate(tradable, axis=0),
+                np.take_along_axis(target, last_tradable, axis=0),
+                0.0,
+            )
+
+        # 仓位变化，第一根K线从空仓开始
+        trade = np.diff(target, axis=0, prepend=0.0)
+        # 减少多头或增加空头视为卖出，需要缴纳印花税
+        buy = np.clip(trade, 0.0, None)
+        sell = np.clip(-trade, 0.0, None)
+        cost = (buy + sell) * self.fee_rate + sell * self.stamp_duty
+
+        # 收盘时调整的仓位从下一根K线开始承担价格变化
+        held = np.zeros_like(target)
+        held[1:] = target[:-1]
+        net_return = held * price_return - cost
+        equity = np.cumprod(1 + net_return, axis=0)
+
+        return {
+            "position": target,
+            "turnover": np.abs(trade),
+            "cost": cost,
+            "net_return": net_return,
+            "equity": equity,
+        }
+
+    def summarize(self, result: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """由simulate()的结果计算每一列的统计量"""
+        net_return = result["net_return"]
+        equity = result["equity"]
+        years = len(net_return) / self.periods_per_year
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        mean = net_return.mean(axis=0)
+        std = (
+            net_return.std(axis=0, ddof=1)
+            if len(net_return) > 1
+            else np.zeros_like(mean)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(
+                std > 0, mean / std * np.sqrt(self.periods_per_year), np.nan
+            )
+        return {
+            "total_return": equity[-1] - 1,
+            "annual_return": np.power(np.clip(equity[-1], 0.0, None), 1 / years) - 1,
+            "sharpe": sharpe,
+            "max_drawdown": drawdown.min(axis=0),
+            "turnover": result["turnover"].sum(axis=0),
+            "annual_turnover": result["turnover"].sum(axis=0) / years,
+            "cost": result["cost"].sum(axis=0),
+            "exposure": (result["position"] != 0).mean(axis=0),
+        }
+
+    @staticmethod
+    def hold_period_signal(
+        signal: pd.Series,
+        daily_index: pd.DatetimeIndex,
+        period: str,
+        period_index: Optional[pd.DatetimeIndex] = None,
+    ) -> pd.Series:
+        """
+        将周K线等较长周期的判断值展开到日K线上：只取该周期K线日期上的判断值，\n
+        并保持到下一根该周期的K线，第一根该周期的K线之前为空仓\n
+        period_index为该周期K线的日期，默认与KlineResampler一致，取每个周期内最后一个交易日
+        """
+        if period_index is None:
+            period_index = pd.DatetimeIndex(
+                daily_index.to_series()
+                .groupby(daily_index.to_period(PERIOD_FREQ[period]), sort=True)
+                .max()
+                .values
+            )
+        return (
+            signal.reindex(period_index)
+            .reindex(daily_index, method="ffill")
+            .fillna(0.0)
+        )
+
+    def run(
+        self,
+        judge: Union[DataFrame, list[DataFrame]],
+        ohlc_df: DataFrame,
+        price_column: str = "收盘",
+        period_index: Optional[dict[str, pd.DatetimeIndex]] = None,
+    ) -> tuple[DataFrame, DataFrame]:
+        """
+        回测MyIndicator.analyze()的结果，judge可以是一个判断值DataFrame或analyze()返回的列表\n
+        判断值按ohlc_df（日K线）的日期对齐，不在判断值中的日期视为空仓；\n
+        列名为weekly、monthly等周期的判断值只在该周期的K线上更新，其间保持不变，\n
+        周期K线的日期可由period_index（{周期: 日期}，例如各周期K线的index）指定\n
+        返回(净值, 汇总)：净值的每一列对应一个策略列，汇总每行为一个策略列
+        """
+        frames = judge if isinstance(judge, list) else [judge]
+        daily_index = pd.DatetimeIndex(ohlc_df.index)
+        columns = {}
+        for i, df in enumerate(frames):
+            prefix = f"{i}_" if len(frames) > 1 else ""
+            for column in df.columns:
+                signal = df[column].astype(float)
+                if column in PERIOD_FREQ:
+                    columns[f"{prefix}{column}"] = self.hold_period_signal(
+                        signal,
+                        daily_index,
+                        column,
+                        (period_index or {}).get(column),
+                    )
+                else:
+                    columns[f"{prefix}{column}"] = signal.reindex(daily_index)
+        df_signal = DataFrame(columns, index=daily_index)
+
+        result = self.simulate(
+            ohlc_df[price_column].to_numpy(dtype=float), df_signal.to_numpy()
+        )
+        df_equity = DataFrame(
+            result["equity"], index=ohlc_df.index, columns=df_signal.columns
+        )
+        df_summary = DataFrame(self.summarize(result), index=df_signal.columns)
+        df_summary.index.name = "strategy"
+        return df_equity, df_summary
+
+    def run_many(
+        self,
+        items: dict[Hashable, tuple[Union[DataFrame, list[DataFrame]], DataFrame]],
+        price_column: str = "收盘",
+    ) -> DataFrame:
+        """
+        批量回测，items为{键: (判断值, K线)}，键通常为产品代码或(产品代码, 指标)\n
+        同一产品的所有策略列在一次simulate()中计算，返回所有组合的汇总
+        """
+        summaries = []
+        for key, (judge, ohlc_df) in items.items():
+            _, df_summary = self.run(judge, ohlc_df, price_column)
+            summaries.append(
+                df_summary.reset_index().assign(key=[key] * len(df_summary))
+            )
+        if not summaries:
+            return DataFrame()
+        return pd.concat(summaries, ignore_index=True).set_index(["key", "strategy"])
+
+    def run_matrix(self, close: DataFrame, signal: DataFrame) -> DataFrame:
+        """
+        多个产品在同一交易日历上的回测，close与signal为同形状的宽表（行为日期，列为产品）\n
+        一次simulate()计算全部列，适合全市场的批量回测
+        """
+        signal = signal.reindex(index=close.index, columns=close.columns)
+        result = self.simulate(close.to_numpy(dtype=float), signal.to_numpy())
+        return DataFrame(self.summarize(result), index=close.columns)
@@ -0,0 +1,200 @@
+"""chart_renderer.py 策略结果的批量绘图：长序列先降采样，图形对象复用，多进程输出png或精简的svg"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pandas import DataFrame, Series
+from config import do_logging
+from typing import NamedTuple, Optional
+
+import os
+
+import numpy as np
+
+logger = do_logging()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets降采样，返回保留的点的位置，x、y中不能有nan\n
+    首尾两点总是保留，其余每个桶保留与前一个保留点、下一个桶均值构成的三角形面积最大的点
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 中间n-2个点分为n_out-2个桶，各桶的均值一次算出
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # 最后一个桶的“下一个桶”为末尾的点
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[previous] - mean_x[i + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y[i + 1] - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """每个桶保留最小值和最大值所在的点，尖峰不会被抹平，返回升序的位置"""
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    bucket_size = int(np.ceil(n / n_buckets))
+    # 末尾补齐为整桶，补齐的部分不会被选中
+    padded = np.full(bucket_size * n_buckets, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    valid = ~np.isnan(buckets).all(axis=1)
+    offsets = np.arange(n_buckets)[valid] * bucket_size
+    low = offsets + np.nanargmin(buckets[valid], axis=1)
+    high = offsets + np.nanargmax(buckets[valid], axis=1)
+    return np.unique(np.concatenate([[0, n - 1], low, high]))
+
+
+def decimate(series: Series, max_points: int, method: str = "lttb") -> Series:
+    """将序列降采样到约max_points个点，method为"lttb"或"minmax"，缺失值不参与绘图"""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    if method == "lttb":
+        index = lttb_indices(np.arange(len(series)), series.to_numpy(), max_points)
+    elif method == "minmax":
+        index = minmax_indices(series.to_numpy(), max_points // 2)
+    else:
+        raise ValueError(f"不支持的降采样方式'{method}'，可选：['lttb', 'minmax']")
+    return series.iloc[index]
+
+
+class ChartJob(NamedTuple):
+    """一张图的数据：收盘价、支撑/阻力线（可选）、判断值，以及输出路径（后缀决定格式）"""
+
+    title: str
+    closing_price: Series
+    judge: Series
+    path: str
+    df_srline: Optional[DataFrame] = None
+
+
+class ChartRenderer:
+    """
+    策略结果的绘图，matplotlib在第一次绘图时才导入并切换到Agg后端\n
+    同一个对象的多次绘图复用同一个Figure，只更新线条数据\n
+    价格类的线用LTTB降采样，判断值用min/max降采样，保证信号的跳变不丢失
+    """
+
+    def __init__(
+        self, max_points: int = 1000, figsize: tuple = (12, 6), dpi: int = 100
+    ) -> None:
+        self.max_points = max_points
+        self.figsize = figsize
+        self.dpi = dpi
+        self._figure = None
+        self._axes = None
+        self._lines: dict = {}
+
+    def _setup(self) -> None:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+
+        # svg中的文字不转为路径，长线条做路径简化
+        matplotlib.rcParams["svg.fonttype"] = "none"
+        matplotlib.rcParams["path.simplify"] = True
+
+        self._figure = Figure(figsize=self.figsize, dpi=self.dpi)
+        price_ax, judge_ax = self._figure.subplots(
+            2, 1, sharex=True, gridspec_kw={"height_ratios": [3, 1]}
+        )
+        (self._lines["price"],) = price_ax.plot([], [], lw=0.8, label="Close")
+        (self._lines["support"],) = price_ax.plot([], [], lw=0.8, label="Support Line")
+        (self._lines["resistance"],) = price_ax.plot(
+            [], [], lw=0.8, label="Resistance Line"
+        )
+        (self._lines["judge"],) = judge_ax.step(
+            [], [], where="post", lw=0.8, color="tab:purple"
+        )
+        price_ax.legend(loc="upper left")
+        judge_ax.set_ylim(-1.1, 1.1)
+        self._axes = (price_ax, judge_ax)
+
+    def render(self, job: ChartJob) -> str:
+        """绘制一张图并保存，返回保存的路径"""
+        if self._figure is None:
+            self._setup()
+        price_ax, judge_ax = self._axes
+
+        price = decimate(job.closing_price, self.max_points, "lttb")
+        self._lines["price"].set_data(price.index, price.to_numpy())
+        for name, column in [("support", "支撑线"), ("resistance", "阻力线")]:
+            if job.df_srline is not None and column in job.df_srline.columns:
+                line = decimate(job.df_srline[column], self.max_points, "lttb")
+                self._lines[name].set_data(line.index, line.to_numpy())
+                self._lines[name].set_visible(True)
+            else:
+                self._lines[name].set_visible(False)
+        judge = decimate(job.judge, self.max_points, "minmax")
+        self._lines["judge"].set_data(judge.index, judge.to_numpy())
+
+        price_ax.set_title(job.title)
+        price_ax.relim(visible_only=True)
+        price_ax.autoscale_view()
+        judge_ax.set_xlim(job.closing_price.index[0], job.closing_price.index[-1])
+
+        os.makedirs(os.path.dirname(job.path) or ".", exist_ok=True)
+        self._figure.savefig(job.path, dpi=self.dpi)
+        return job.path
+
+
+# 子进程中复用的绘图对象
+_process_renderer: Optional[ChartRenderer] = None
+
+
+def _init_worker(max_points: int, figsize: tuple, dpi: int) -> None:
+    global _process_renderer
+    _process_renderer = ChartRenderer(max_points=max_points, figsize=figsize, dpi=dpi)
+
+
+def _render_in_worker(job: ChartJob) -> str:
+    return _process_renderer.render(job)
+
+
+def render_batch(
+    jobs: list[ChartJob],
+    workers: int = 1,
+    max_points: int = 1000,
+    figsize: tuple = (12, 6),
+    dpi: int = 100,
+) -> list[str]:
+    """批量绘图，workers大于1时使用进程池，每个子进程只创建一个Figure"""
+    if workers <= 1 or len(jobs) <= 1:
+        renderer = ChartRenderer(max_points=max_points, figsize=figsize, dpi=dpi)
+        paths = [renderer.render(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(max_points, figsize, dpi),
+        ) as executor:
+            paths = list(
+                executor.map(
+                    _render_in_worker,
+                    jobs,
+                    chunksize=max(1, len(jobs) // (workers * 4)),
+                )
+            )
+    logger.info(f"绘图完成，共{len(paths)}张")
+    return paths
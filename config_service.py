@@ -0,0 +1,171 @@
+"""config_service.py 进程内共享的config.json读写服务，读取走内存，写入合并后一次性保存"""
+
+from contextlib import contextmanager
+from config import __BASE_PATH__, do_logging
+from typing import Iterator, Optional
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+
+logger = do_logging()
+
+
+@contextmanager
+def file_lock(lock_path: str) -> Iterator[None]:
+    """跨进程的文件锁，Windows使用msvcrt，其他系统使用fcntl"""
+    with open(lock_path, "a+") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK重试约10秒后仍失败会抛出异常，继续等待
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class ConfigService:
+    """
+    config.json中"ValueInCalculation"的读写服务\n
+    每个进程只读取一次文件，写入先记录在内存中，调用flush()时加文件锁、合并磁盘上的最新内容后原子保存\n
+    参数没有变化的写入会被忽略，进程退出时自动flush()
+    """
+
+    def __init__(self, config_path: Optional[str] = None) -> None:
+        self.config_path = config_path or f"{__BASE_PATH__}\\config.json"
+        self._config_data: Optional[dict] = None
+        # 待保存的写入，(指标名称, 指标配置, 策略配置)
+        self._pending: list[tuple[str, Optional[dict], Optional[dict]]] = []
+        self._lock = threading.RLock()
+        atexit.register(self.flush)
+
+    def _load(self) -> dict:
+        """读取配置文件，每个进程只读取一次"""
+        if self._config_data is None:
+            with open(self.config_path, "r") as f:
+                self._config_data = json.load(f)
+        # 查找键"ValueInCalculation"
+        if "ValueInCalculation" not in self._config_data.keys():
+            raise KeyError("键'ValueInCalculation'不存在！")
+        return self._config_data
+
+    def read(self, indicator_name: str, strategy_name: Optional[str]) -> Optional[dict]:
+        """读取指标配置，strategy_name不为None时读取策略配置（不含策略名称）"""
+        with self._lock:
+            value_in_calculation = self._load()["ValueInCalculation"]
+            try:
+                if strategy_name is None:
+                    return copy.deepcopy(value_in_calculation[indicator_name])
+                strategy_data = copy.deepcopy(
+                    value_in_calculation[indicator_name][strategy_name]
+                )
+            except KeyError:
+                return None
+            # 删除策略名称
+            strategy_data.pop("strategy_name", None)
+            return strategy_data
+
+    def write(
+        self,
+        indicator_name: str,
+        indicator_config_dict: Optional[dict],
+        strategy_config_dict: Optional[dict],
+    ) -> None:
+        """写入指标或策略配置，只更新内存，参数有变化时才记录待保存"""
+        with self._lock:
+            if ConfigService._apply(
+                self._load(),
+                indicator_name,
+                indicator_config_dict,
+                strategy_config_dict,
+            ):
+                self._pending.append(
+                    (
+                        indicator_name,
+                        copy.deepcopy(indicator_config_dict),
+                        copy.deepcopy(strategy_config_dict),
+                    )
+                )
+
+    def flush(self) -> None:
+        """将待保存的写入合并到磁盘上的配置文件，使用临时文件加重命名保证原子性"""
+        with self._lock:
+            if not self._pending:
+                return
+            with file_lock(f"{self.config_path}.lock"):
+                # 重新读取磁盘上的内容，其他进程的写入不会丢失
+                with open(self.config_path, "r") as f:
+                    config_data = json.load(f)
+                if "ValueInCalculation" not in config_data.keys():
+                    raise KeyError("键'ValueInCalculation'不存在！")
+                for indicator_name, indicator_dict, strategy_dict in self._pending:
+                    ConfigService._apply(
+                        config_data, indicator_name, indicator_dict, strategy_dict
+                    )
+
+                tmp_path = f"{self.config_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(config_data, f, indent=4)
+                os.replace(tmp_path, self.config_path)
+
+            logger.debug(f"保存{len(self._pending)}项配置\n>>>>{self.config_path}")
+            self._config_data = config_data
+            self._pending.clear()
+
+    @staticmethod
+    def _apply(
+        config_data: dict,
+        indicator_name: str,
+        indicator_config_dict: Optional[dict],
+        strategy_config_dict: Optional[dict],
+    ) -> bool:
+        """将一次写入应用到config_data，返回内容是否有变化"""
+        value_in_calculation = config_data["ValueInCalculation"]
+        indicator_data = value_in_calculation.setdefault(indicator_name, {})
+        changed = False
+
+        if indicator_config_dict is not None:
+            # 指标参数整体替换，保留已有的策略配置
+            strategy_data = {
+                key: value
+                for key, value in indicator_data.items()
+                if isinstance(value, dict) and "strategy_name" in value
+            }
+            new_indicator_data = {**indicator_config_dict, **strategy_data}
+            if new_indicator_data != indicator_data:
+                value_in_calculation[indicator_name] = indicator_data = (
+                    new_indicator_data
+                )
+                changed = True
+
+        if strategy_config_dict is not None:
+            strategy_name = f"{strategy_config_dict['strategy_name']}"
+            if indicator_data.get(strategy_name) != strategy_config_dict:
+                indicator_data[strategy_name] = copy.deepcopy(strategy_config_dict)
+                changed = True
+
+        return changed
+
+
+# 进程内共享的配置服务
+config_service = ConfigService()
@@ -0,0 +1,62 @@
+"""cross_detector.py 向量化的交叉检测，结果与价格序列逐日对齐"""
+
+from pandas import Series
+
+import numpy as np
+
+
+class CrossDetector:
+    """
+    价格与指标线的交叉、触碰检测\n
+    结果均为与price.index对齐的数组，策略中可以直接作为掩码使用
+    """
+
+    @staticmethod
+    def _side(line: Series, price: Series) -> np.ndarray:
+        """
+        价格在线上方为1，下方为-1\n
+        恰好落在线上时沿用之前的方向，之前没有方向或数据缺失时为0
+        """
+        diff = price.to_numpy(dtype=float) - line.reindex(price.index).to_numpy(
+            dtype=float
+        )
+        side = np.sign(diff)
+        side[np.isnan(side)] = 0
+        # 前向填充0值，价格只是触碰到线上再离开时不算交叉
+        nonzero_pos = np.maximum.accumulate(
+            np.where(side != 0, np.arange(len(side)), 0)
+        )
+        return side[nonzero_pos]
+
+    @staticmethod
+    def cross_events(line: Series, price: Series) -> np.ndarray:
+        """
+        交叉事件，价格上穿指标线为1，下穿为-1，其余为0\n
+        交叉记在价格到达另一侧的那一天
+        """
+        side = CrossDetector._side(line, price)
+        events = np.zeros(len(side), dtype=np.int8)
+        if len(side) > 1:
+            changed = (side[1:] != side[:-1]) & (side[1:] != 0) & (side[:-1] != 0)
+            events[1:][changed] = side[1:][changed]
+        return events
+
+    @staticmethod
+    def cross_mask(line: Series, price: Series) -> np.ndarray:
+        """发生交叉（任意方向）的日期为True"""
+        return CrossDetector.cross_events(line, price) != 0
+
+    @staticmethod
+    def golden_death_cross(fast_line: Series, slow_line: Series) -> np.ndarray:
+        """均线金叉为1，死叉为-1，其余为0，与fast_line.index对齐"""
+        return CrossDetector.cross_events(slow_line, fast_line)
+
+    @staticmethod
+    def touch_mask(band: Series, price: Series, upper: bool) -> np.ndarray:
+        """触碰通道线，upper为True时检测价格不低于上轨，否则检测价格不高于下轨"""
+        band_values = band.reindex(price.index).to_numpy(dtype=float)
+        price_values = price.to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            if upper:
+                return price_values >= band_values
+            return price_values <= band_values
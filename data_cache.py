@@ -0,0 +1,179 @@
+"""data_cache.py 进程内的K线和指标数据缓存，同一产品的数据只读取一次"""
+
+from collections import OrderedDict
+from pandas import DataFrame
+from utils.enumeration_label import ProductType, IndicatorName
+from utils.kline_resampler import KlineResampler
+from utils.kline_schema import DEFAULT_PRECISION, normalize_df_dict
+from utils.pipeline_profiler import pipeline_profiler
+from config import do_logging
+from typing import Optional
+
+import datetime as dt
+import threading
+
+logger = do_logging()
+
+
+class DataCache:
+    """
+    以(产品代码, 日期, 产品类型, 精度)为键缓存K线字典，以(产品代码, 日期, 产品类型, 指标名称)为键缓存指标字典\n
+    超过条目上限或内存上限时，淘汰最久未使用的条目\n
+    缓存中的DataFrame为共享对象，取出后请不要原地修改
+    """
+
+    def __init__(self, max_items: int = 256, max_bytes: int = 512 * 1024**2) -> None:
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._store: OrderedDict[tuple, dict[str, DataFrame]] = OrderedDict()
+        self._sizes: dict[tuple, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _size_of(df_dict: dict[str, DataFrame]) -> int:
+        """估算字典中所有DataFrame占用的内存"""
+        return int(
+            sum(df.memory_usage(index=True, deep=True).sum() for df in df_dict.values())
+        )
+
+    def get(self, key: tuple) -> Optional[dict[str, DataFrame]]:
+        """取出缓存，未命中时返回None"""
+        with self._lock:
+            df_dict = self._store.get(key)
+            if df_dict is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store.move_to_end(key)
+            return df_dict
+
+    def put(self, key: tuple, df_dict: dict[str, DataFrame]) -> None:
+        """放入缓存，必要时淘汰最久未使用的条目"""
+        size = self._size_of(df_dict)
+        with self._lock:
+            self._discard(key)
+            # 单个条目超过内存上限时不缓存
+            if size > self.max_bytes:
+                logger.debug(f"缓存条目过大，不缓存\n>>>>{key}")
+                return
+            self._store[key] = df_dict
+            self._sizes[key] = size
+            self._total_bytes += size
+            while (
+                len(self._store) > self.max_items or self._total_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._store))
+                logger.debug(f"淘汰缓存\n>>>>{oldest_key}")
+                self._discard(oldest_key)
+
+    def invalidate(self, product_code: Optional[str] = None) -> None:
+        """删除某个产品的全部缓存，product_code为None时清空缓存"""
+        with self._lock:
+            for key in list(self._store.keys()):
+                if product_code is None or key[1] == product_code:
+                    self._discard(key)
+
+    def _discard(self, key: tuple) -> None:
+        if key in self._store:
+            del self._store[key]
+            self._total_bytes -= self._sizes.pop(key)
+
+    def product_df_dict(
+        self,
+        product_code: str,
+        today_date: Optional[dt.date],
+        product_type: ProductType,
+        precision: str = DEFAULT_PRECISION,
+    ) -> dict[str, DataFrame]:
+        """
+        获取K线字典，未命中时调用dataPicker.product_source_picker()\n
+        载入的K线经normalize_df_dict()统一数据类型，precision为价格列的浮点精度
+        """
+        today_date = today_date or dt.date.today()
+        key = ("kline", product_code, today_date, product_type, precision)
+        df_dict = self.get(key)
+        if df_dict is None:
+            # 在函数内导入，避免与指标模块循环导入
+            from utils import dataSource_picker as dp
+
+            with pipeline_profiler.span(
+                "product_source_picker", product_code
+            ) as record:
+                df_dict = dp.dataPicker.product_source_picker(
+                    product_code=product_code,
+                    today_date=today_date,
+                    product_type=product_type,
+                )
+                record["rows"] = sum(len(df) for df in df_dict.values())
+            # 数据源只提供日K线时，周K线由日K线合成
+            df_dict = normalize_df_dict(
+                KlineResampler.fill_periods(df_dict, ["weekly"]), precision
+            )
+            self.put(key, df_dict)
+        return df_dict
+
+    def put_product_df_dict(
+        self,
+        product_code: str,
+        today_date: Optional[dt.date],
+        product_type: ProductType,
+        df_dict: dict[str, DataFrame],
+        precision: str = DEFAULT_PRECISION,
+    ) -> None:
+        """放入已在别处获取的K线字典，例如批量并发获取的结果"""
+        today_date = today_date or dt.date.today()
+        self.put(
+            ("kline", product_code, today_date, product_type, precision),
+            normalize_df_dict(
+                KlineResampler.fill_periods(df_dict, ["weekly"]), precision
+            ),
+        )
+
+    def indicator_df_dict(
+        self,
+        product_code: str,
+        today_date: Optional[dt.date],
+        product_type: ProductType,
+        indicator_name: IndicatorName,
+        product_df_dict: Optional[dict[str, DataFrame]] = None,
+    ) -> dict[str, DataFrame]:
+        """获取指标字典，未命中时调用dataPicker.indicator_source_picker()"""
+        today_date = today_date or dt.date.today()
+        key = ("indicator", product_code, today_date, product_type, indicator_name)
+        df_dict = self.get(key)
+        if df_dict is None:
+            # 在函数内导入，避免与指标模块循环导入
+            from utils import dataSource_picker as dp
+
+            df_dict = dp.dataPicker.indicator_source_picker(
+                product_code=product_code,
+                today_date=today_date,
+                product_type=product_type,
+                indicator_name=indicator_name,
+                product_df_dict=product_df_dict
+                or self.product_df_dict(product_code, today_date, product_type),
+            )
+            self.put(key, df_dict)
+        return df_dict
+
+    def put_indicator(
+        self,
+        product_code: str,
+        today_date: Optional[dt.date],
+        product_type: ProductType,
+        indicator_name: IndicatorName,
+        df_dict: dict[str, DataFrame],
+    ) -> None:
+        """指标重新计算后，用新结果替换缓存"""
+        today_date = today_date or dt.date.today()
+        self.put(
+            ("indicator", product_code, today_date, product_type, indicator_name),
+            df_dict,
+        )
+
+
+# 进程内共享的缓存
+data_cache = DataCache()
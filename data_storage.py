@@ -0,0 +1,268 @@
+"""data_storage.py 数据的存储后端，可在csv、feather和内存映射的npy之间切换"""
+
+from abc import ABC, abstractmethod
+from pandas import DataFrame
+from typing import Callable, Optional
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class StorageBackend(ABC):
+    """存储后端的抽象类，path_stem为不带后缀的文件路径"""
+
+    suffix: str = ""
+
+    def path_of(self, path_stem: str) -> str:
+        return f"{path_stem}{self.suffix}"
+
+    def exists(self, path_stem: str) -> bool:
+        return os.path.exists(self.path_of(path_stem))
+
+    @abstractmethod
+    def write(self, df: DataFrame, path_stem: str) -> str:
+        """保存DataFrame，返回实际写入的路径"""
+        pass
+
+    @abstractmethod
+    def read(self, path_stem: str) -> DataFrame:
+        """读取DataFrame，索引为第一列"""
+        pass
+
+
+class CsvStorage(StorageBackend):
+    """csv文本格式，便于查看和导出"""
+
+    suffix = ".csv"
+
+    def write(self, df: DataFrame, path_stem: str) -> str:
+        path = self.path_of(path_stem)
+        with open(path, mode="w", encoding="utf-8") as f:
+            df.to_csv(f, index=True, encoding="utf-8")
+        return path
+
+    def read(self, path_stem: str) -> DataFrame:
+        return pd.read_csv(
+            self.path_of(path_stem), index_col=0, parse_dates=True, encoding="utf-8"
+        )
+
+
+class FeatherStorage(StorageBackend):
+    """feather列式二进制格式，需要安装pyarrow"""
+
+    suffix = ".feather"
+
+    def write(self, df: DataFrame, path_stem: str) -> str:
+        path = self.path_of(path_stem)
+        # feather不保存索引，先将索引转为普通列
+        df.reset_index().to_feather(path)
+        return path
+
+    def read(self, path_stem: str) -> DataFrame:
+        df = pd.read_feather(self.path_of(path_stem), memory_map=True)
+        return df.set_index(df.columns[0])
+
+
+class NpyStorage(StorageBackend):
+    """
+    npy格式，每个DataFrame保存为一个文件夹\n
+    同一种精度的浮点列合并为一个二维数组，读取时以内存映射方式直接构造DataFrame，不解析也不复制\n
+    mmap为True时读出的浮点数据是只读的，需要修改时请先copy()\n
+    每次写入生成一个新的版本文件夹，再改写CURRENT指向它，旧版本仍被内存映射时写入不受影响
+    """
+
+    suffix = ".npy"
+    pointer_name = "CURRENT"
+
+    def __init__(self, mmap: bool = True) -> None:
+        self.mmap = mmap
+
+    def exists(self, path_stem: str) -> bool:
+        # 写入完成（CURRENT已指向某个版本）才算存在
+        return os.path.exists(os.path.join(self.path_of(path_stem), self.pointer_name))
+
+    def _current_version(self, path: str) -> Optional[str]:
+        """CURRENT中记录的版本文件夹，尚未写入过时返回None"""
+        pointer_path = os.path.join(path, self.pointer_name)
+        if not os.path.exists(pointer_path):
+            return None
+        with open(pointer_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+
+    def write(self, df: DataFrame, path_stem: str) -> str:
+        path = self.path_of(path_stem)
+        os.makedirs(path, exist_ok=True)
+        previous_version = self._current_version(path)
+        version = f"v{time.time_ns()}_{os.getpid()}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+
+        float_columns = [
+            col for col in df.columns if pd.api.types.is_float_dtype(df[col].dtype)
+        ]
+        other_columns = [col for col in df.columns if col not in float_columns]
+        is_datetime_index = isinstance(df.index, pd.DatetimeIndex)
+
+        # 浮点列按精度分组，每组保存为(行数, 列数)的二维数组，不同精度不互相转换
+        float_groups: dict[str, list] = {}
+        for col in float_columns:
+            float_groups.setdefault(df[col].dtype.name, []).append(col)
+        for dtype_name, columns in float_groups.items():
+            np.save(
+                os.path.join(version_path, f"values_{dtype_name}.npy"),
+                df[columns].to_numpy(dtype=dtype_name),
+            )
+        for i, col in enumerate(other_columns):
+            np.save(
+                os.path.join(version_path, f"other_{i}.npy"),
+                _to_plain_array(df[col]),
+            )
+        np.save(
+            os.path.join(version_path, "index.npy"),
+            (
+                df.index.values.astype("datetime64[ns]").view("int64")
+                if is_datetime_index
+                else _to_plain_array(df.index)
+            ),
+        )
+        with open(os.path.join(version_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "columns": [str(col) for col in df.columns],
+                    "float_groups": {
+                        dtype_name: [str(col) for col in columns]
+                        for dtype_name, columns in float_groups.items()
+                    },
+                    "other_columns": [str(col) for col in other_columns],
+                    "index_name": df.index.name,
+                    "datetime_index": is_datetime_index,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+        # 最后改写CURRENT，读取时以它为准
+        pointer_path = os.path.join(path, self.pointer_name)
+        tmp_pointer_path = f"{pointer_path}.{version}.tmp"
+        with open(tmp_pointer_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_pointer_path, pointer_path)
+
+        # 保留上一个版本，正在读取它的进程不受影响，更早的版本删除
+        # 仍被内存映射的文件在Windows上无法删除，留到之后的写入再清理
+        for name in os.listdir(path):
+            if name in (self.pointer_name, version, previous_version):
+                continue
+            old_path = os.path.join(path, name)
+            if os.path.isdir(old_path):
+                shutil.rmtree(old_path, ignore_errors=True)
+        return path
+
+    def read(self, path_stem: str) -> DataFrame:
+        path = self.path_of(path_stem)
+        version = self._current_version(path)
+        if version is None:
+            raise FileNotFoundError(f"没有已写入的数据\n>>>>{path}")
+        path = os.path.join(path, version)
+        mmap_mode = "r" if self.mmap else None
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        index_values = np.load(os.path.join(path, "index.npy"))
+        if meta["datetime_index"]:
+            index = pd.DatetimeIndex(
+                index_values.view("datetime64[ns]"), name=meta["index_name"]
+            )
+        else:
+            index = pd.Index(index_values, name=meta["index_name"])
+
+        float_frames = [
+            DataFrame(
+                np.load(
+                    os.path.join(path, f"values_{dtype_name}.npy"),
+                    mmap_mode=mmap_mode,
+                ),
+                index=index,
+                columns=columns,
+                copy=False,
+            )
+            for dtype_name, columns in meta["float_groups"].items()
+        ]
+        if len(float_frames) == 1:
+            df = float_frames[0]
+        elif float_frames:
+            df = pd.concat(float_frames, axis=1, copy=False)
+        else:
+            df = DataFrame(index=index)
+        for i, col in enumerate(meta["other_columns"]):
+            df[col] = np.load(os.path.join(path, f"other_{i}.npy"))
+
+        # 存在非浮点列或多种精度时，才需要恢复原来的列顺序
+        if list(df.columns) != meta["columns"]:
+            df = df[meta["columns"]]
+        return df
+
+
+def _to_plain_array(values) -> np.ndarray:
+    """转为无需pickle即可保存的数组，object类型按字符串保存"""
+    array = np.asarray(values)
+    if array.dtype == object:
+        array = array.astype(str)
+    return array
+
+
+# 可选的存储格式
+storage_backends: dict[str, type[StorageBackend]] = {
+    "csv": CsvStorage,
+    "feather": FeatherStorage,
+    "npy": NpyStorage,
+}
+
+
+def get_storage(storage_format: str) -> StorageBackend:
+    """根据格式名称获取存储后端"""
+    if storage_format not in storage_backends:
+        raise ValueError(
+            f"不支持的存储格式'{storage_format}'，可选：{list(storage_backends.keys())}"
+        )
+    return storage_backends[storage_format]()
+
+
+class WriteBatch:
+    """
+    暂存待写入的DataFrame，调用flush()时一次性写出\n
+    用于一个产品的全部指标和策略计算完成后集中保存
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[tuple[str, DataFrame, str]] = []
+        self._callbacks: list[Callable[[], None]] = []
+
+    def add(self, storage_format: str, df: DataFrame, path_stem: str) -> str:
+        """登记一次写入，返回将要写入的路径"""
+        self._pending.append((storage_format, df, path_stem))
+        return get_storage(storage_format).path_of(path_stem)
+
+    def after_flush(self, callback: Callable[[], None]) -> None:
+        """登记在全部数据写出之后执行的函数，例如更新记录这些文件的清单"""
+        self._callbacks.append(callback)
+
+    def flush(self) -> list[str]:
+        """写出全部暂存的数据，再依次执行after_flush()登记的函数，返回写入的路径"""
+        written = [
+            get_storage(storage_format).write(df, path_stem)
+            for storage_format, df, path_stem in self._pending
+        ]
+        self._pending.clear()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return written
+
+    def __len__(self) -> int:
+        return len(self._pending)
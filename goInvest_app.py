@@ -1,10 +1,32 @@
-from config import __BASE_PATH__, DirectoryManager
+from config import __BASE_PATH__, DirectoryManager, do_logging
 from productType import stock as sk
+from utils.config_service import config_service
+from utils.pipeline_profiler import pipeline_profiler, PROFILE_DIR_ENV
+from utils.screener import panel_recorder
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pandas import DataFrame, Series
+from typing import Optional
+
+import argparse
+import datetime as dt
+import os
+import time
+
+import pandas as pd
+
+logger = do_logging()
 
 
 class goInvest:
     @staticmethod
-    def main() -> None:
+    def main(workers: int = 1, chunk_size: int = 1) -> None:
+        """
+        workers大于1时，使用进程池批量分析名单中的产品
+        """
+        if workers > 1:
+            goInvest.batch_main(workers=workers, chunk_size=chunk_size)
+            return
+
         # 分析的请求名单
         requirement = DirectoryManager().directoty_manage()
         # 获取行数，shape函数返回值为元组(行数，列数)
@@ -17,6 +39,171 @@ class goInvest:
                     stock = sk.Stock(requirement.loc[sequence], today_date=None)
                     stock.analyze_stock()
 
+        # 保存本次运行中修改的配置，并将最新的指标值、判断值合并到筛选面板
+        config_service.flush()
+        try:
+            panel_recorder.flush()
+        except Exception as e:
+            logger.warning(f"筛选面板合并失败\n>>>>{type(e).__name__}: {e}")
+
+    @staticmethod
+    def batch_main(workers: int, chunk_size: int = 1) -> DataFrame:
+        """
+        批量分析模式，将名单分块后交给进程池\n
+        返回按名单顺序排列的汇总表，包含每个产品的状态、错误信息和耗时
+        """
+        # 分析的请求名单
+        requirement = DirectoryManager().directoty_manage()
+        require_num = requirement.shape[0]
+        if require_num == 0:
+            logger.info("名单为空，没有需要分析的产品")
+            return DataFrame(
+                columns=[
+                    "identityCode",
+                    "productType",
+                    "status",
+                    "error",
+                    "seconds",
+                ],
+                index=pd.Index([], name="sequence"),
+            )
+        # 所有产品使用同一个日期，避免跨越零点时结果不一致
+        today_date = dt.date.today()
+
+        # 分块，每块内的产品在同一个子进程中依次分析
+        chunk_size = max(1, chunk_size)
+        chunks = [
+            range(start, min(start + chunk_size, require_num))
+            for start in range(0, require_num, chunk_size)
+        ]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    goInvest._analyze_chunk,
+                    [(seq, requirement.loc[seq]) for seq in chunk],
+                    today_date,
+                ): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    # 子进程异常退出（如BrokenProcessPool）时，整个分块记为失败
+                    error = f"{type(e).__name__}: {e}"
+                    results.extend(
+                        {
+                            "sequence": seq,
+                            "identityCode": requirement.loc[seq, "identityCode"],
+                            "productType": requirement.loc[seq, "productType"],
+                            "status": "failed",
+                            "error": error,
+                            "seconds": float("nan"),
+                            "trace": [],
+                        }
+                        for seq in futures[future]
+                    )
+                logger.info(f"批量分析进度：{len(results)}/{require_num}")
+
+        # 收集子进程中的耗时记录
+        for result in sorted(results, key=lambda result: result["sequence"]):
+            pipeline_profiler.records.extend(result.pop("trace"))
+
+        # 按名单顺序汇总结果
+        df_summary = DataFrame(results).sort_values("sequence").set_index("sequence")
+        failed = df_summary[df_summary["status"] == "failed"]
+        logger.info(
+            f"批量分析完成：共{require_num}个，"
+            f"成功{(df_summary['status'] == 'done').sum()}个，失败{len(failed)}个"
+        )
+        for _, row in failed.iterrows():
+            logger.warning(f"{row['identityCode']}分析失败\n>>>>{row['error']}")
+
+        return df_summary
+
+    @staticmethod
+    def _analyze_chunk(
+        chunk: list[tuple[int, Series]], today_date: Optional[dt.date]
+    ) -> list[dict]:
+        """
+        在子进程中依次分析一个分块，分块结束时合并一次筛选面板\n
+        合并失败时，分块中的产品都记为失败
+        """
+        results = [
+            goInvest._analyze_requirement(sequence, requirement, today_date)
+            for sequence, requirement in chunk
+        ]
+        try:
+            panel_recorder.flush()
+        except Exception as e:
+            error = f"筛选面板合并失败，{type(e).__name__}: {e}"
+            for result in results:
+                result["status"] = "failed"
+                result["error"] = (
+                    f"{result['error']}\n{error}" if result["error"] else error
+                )
+        return results
+
+    @staticmethod
+    def _analyze_requirement(
+        sequence: int, requirement: Series, today_date: Optional[dt.date]
+    ) -> dict:
+        """
+        分析名单中的一行，供进程池调用\n
+        单个产品出错时只记录错误信息，不影响其他产品的分析
+        """
+        start_time = time.perf_counter()
+        status = "done"
+        error = ""
+        try:
+            match requirement["productType"]:
+                case "stock":
+                    stock = sk.Stock(requirement, today_date=today_date)
+                    stock.analyze_stock()
+                case _:
+                    status = "skipped"
+            # 子进程退出时不会执行atexit，在这里保存配置
+            config_service.flush()
+        except Exception as e:
+            status = "failed"
+            error = f"{type(e).__name__}: {e}"
+
+        return {
+            "sequence": sequence,
+            "identityCode": requirement["identityCode"],
+            "productType": requirement["productType"],
+            "status": status,
+            "error": error,
+            "seconds": round(time.perf_counter() - start_time, 3),
+            # 子进程中的耗时记录交给主进程汇总
+            "trace": pipeline_profiler.drain(),
+        }
+
 
 # 开始程序
-goInvest.main()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="goInvest")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="进程数，大于1时启用批量分析模式"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1, help="每个子进程任务包含的产品数量"
+    )
+    parser.add_argument(
+        "--trace", default=None, help="输出各阶段耗时记录的路径（.json或.csv）"
+    )
+    parser.add_argument(
+        "--profile-dir", default=None, help="每个产品输出一个cProfile文件到该文件夹"
+    )
+    args = parser.parse_args()
+    if args.profile_dir:
+        # 通过环境变量传给子进程
+        os.environ[PROFILE_DIR_ENV] = args.profile_dir
+
+    goInvest.main(workers=args.workers, chunk_size=args.chunk_size)
+
+    if args.trace:
+        logger.info(f"各阶段耗时汇总\n{pipeline_profiler.summary()}")
+        pipeline_profiler.export_trace(args.trace)
@@ -0,0 +1,80 @@
+"""import_budget.py 检查入口模块的冷启动导入耗时，超过预算时以非零状态退出"""
+
+if __name__ == "__main__":
+    import sys
+    import os
+
+    # 将上级目录加入sys.path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+import argparse
+import os
+import subprocess
+import sys
+
+from typing import Optional
+
+# 默认的导入耗时预算（秒）
+DEFAULT_BUDGET_SECONDS = 1.5
+# 启动时不应被导入的重量级模块
+FORBIDDEN_MODULES = ["matplotlib", "utils.data_analyst", "utils.mySRLine"]
+
+
+def measure_import(module_name: str, base_path: str, repeat: int = 3) -> dict:
+    """
+    在全新的解释器中导入module_name，返回最短耗时（秒）和已被导入的重量级模块\n
+    重复repeat次取最小值，减少磁盘缓存带来的波动
+    """
+    forbidden = repr(FORBIDDEN_MODULES)
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module_name}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {forbidden} if m in sys.modules))\n"
+    )
+    seconds = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=base_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        seconds.append(float(output[0]))
+        loaded = [m for m in output[1].split(",") if m] if len(output) > 1 else []
+    return {"seconds": min(seconds), "loaded": loaded}
+
+
+def check_budget(
+    module_name: str = "goInvest_app",
+    base_path: Optional[str] = None,
+    budget_seconds: float = DEFAULT_BUDGET_SECONDS,
+) -> bool:
+    """检查导入耗时是否在预算内，且没有在启动时导入重量级模块"""
+    if base_path is None:
+        from config import __BASE_PATH__
+
+        base_path = __BASE_PATH__
+
+    result = measure_import(module_name, base_path)
+    print(f"导入{module_name}耗时{result['seconds']:.3f}秒，预算{budget_seconds:.3f}秒")
+    if result["loaded"]:
+        print(f"启动时导入了重量级模块：{result['loaded']}")
+    return result["seconds"] <= budget_seconds and not result["loaded"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查冷启动导入耗时")
+    parser.add_argument("--module", default="goInvest_app", help="要导入的模块")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.environ.get("GOINVEST_IMPORT_BUDGET", DEFAULT_BUDGET_SECONDS)),
+        help="导入耗时预算（秒）",
+    )
+    args = parser.parse_args()
+
+    sys.exit(0 if check_budget(args.module, budget_seconds=args.budget) else 1)
@@ -0,0 +1,236 @@
+"""indicator_benchmark.py 指标计算和策略分析的基准测试，离线运行并记录历史结果"""
+
+if __name__ == "__main__":
+    import sys
+    import os
+
+    # 将上级目录加入sys.path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(sys.argv[0]))))
+
+from contextlib import contextmanager
+from pandas import DataFrame
+from unittest import mock
+from utils.enumeration_label import ProductType, IndicatorName
+from utils.indicator_registry import create_indicator
+from utils.myIndicator_abc import MyIndicator
+from config import __BASE_PATH__
+from typing import Callable, Iterator, Optional
+
+import argparse
+import datetime as dt
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 合成K线的长度
+BAR_SIZES = [1_000, 10_000, 100_000]
+# 仓库中自带的002230分析结果，用它的交易日历生成K线
+CALENDAR_CSV = "002230_SRLine_pressure_area_strategy_anlysis.csv"
+# 默认的性能退化阈值（百分比）
+DEFAULT_REGRESSION_PCT = 20.0
+
+
+def make_ohlc(
+    n_bars: int, seed: int = 0, index: Optional[pd.DatetimeIndex] = None
+) -> dict[str, DataFrame]:
+    """生成随机游走的日K线，并由日K线得到周K线，列名与数据源一致"""
+    rng = np.random.default_rng(seed)
+    if index is None:
+        # 10万根日K线约为380年，从1700年开始才不会超出pandas的日期范围
+        start = np.datetime64("1700-01-01")
+        days = np.arange(start, start + n_bars * 7 // 5 + 7)
+        index = pd.DatetimeIndex(days[np.is_busday(days)][:n_bars])
+    n_bars = len(index)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n_bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n_bars))
+    daily = DataFrame(
+        {
+            "开盘": open_,
+            "收盘": close,
+            "最高": high,
+            "最低": low,
+            "成交量": rng.integers(1_000, 100_000, n_bars),
+        },
+        index=pd.DatetimeIndex(index, name="日期"),
+    )
+    weekly = daily.groupby(daily.index.to_period("W-FRI")).agg(
+        {"开盘": "first", "收盘": "last", "最高": "max", "最低": "min", "成交量": "sum"}
+    )
+    # 周K线以该周最后一个交易日为日期
+    weekly.index = pd.DatetimeIndex(
+        daily.index.to_series().groupby(daily.index.to_period("W-FRI")).max().values,
+        name="日期",
+    )
+    return {"daily": daily, "weekly": weekly}
+
+
+def load_calendar(base_path: str) -> Optional[pd.DatetimeIndex]:
+    """读取002230分析结果的日期作为交易日历，文件不存在时返回None"""
+    for path in [
+        os.path.join(base_path, CALENDAR_CSV),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), CALENDAR_CSV),
+    ]:
+        if os.path.exists(path):
+            return pd.DatetimeIndex(
+                pd.read_csv(path, usecols=[0], parse_dates=[0]).iloc[:, 0]
+            )
+    return None
+
+
+@contextmanager
+def offline_mode() -> Iterator[None]:
+    """
+    离线运行指标：不读写配置文件和数据文件\n
+    save_indicator()的结果保存在内存中，供get_dict()直接返回
+    """
+    results: dict[tuple, dict[str, DataFrame]] = {}
+
+    def save_indicator(self, df_dict, indicator_value_config_dict, **kwargs):
+        results[(self.product_code, self.indicator_name)] = df_dict
+
+    def get_dict(self):
+        key = (self.product_code, self.indicator_name)
+        if key not in results:
+            self.calculate_indicator()
+        return results[key]
+
+    with mock.patch.multiple(
+        MyIndicator,
+        read_from_config=lambda self, strategy_name: None,
+        write_to_config=lambda self, **kwargs: None,
+        save_indicator=save_indicator,
+        save_strategy=lambda self, **kwargs: None,
+        load_strategy=lambda self, *args, **kwargs: None,
+        get_dict=get_dict,
+        _remove_redundant_files=lambda self: None,
+    ):
+        yield
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """重复调用func，返回耗时的中位数（秒）"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def run_benchmarks(
+    base_path: str = __BASE_PATH__,
+    bar_sizes: Optional[list[int]] = None,
+    repeat: int = 3,
+) -> dict[str, float]:
+    """运行全部基准测试，返回{名称: 耗时中位数（秒）}"""
+    datasets = {
+        f"{n_bars}bars": make_ohlc(n_bars) for n_bars in (bar_sizes or BAR_SIZES)
+    }
+    calendar = load_calendar(base_path)
+    if calendar is not None:
+        datasets["002230"] = make_ohlc(len(calendar), index=calendar)
+
+    results = {}
+    with offline_mode():
+        for dataset_name, product_df_dict in datasets.items():
+            for indicator_name in IndicatorName:
+                try:
+                    indicator = create_indicator(
+                        indicator_name,
+                        product_code=dataset_name,
+                        today_date=dt.date.today(),
+                        product_type=ProductType.Stock,
+                        product_df_dict=product_df_dict,
+                    )
+                except ValueError:
+                    # 该指标尚未实现
+                    continue
+                results[
+                    f"{indicator_name.value}.calculate_indicator[{dataset_name}]"
+                ] = time_call(indicator.calculate_indicator, repeat)
+                results[f"{indicator_name.value}.analyze[{dataset_name}]"] = time_call(
+                    indicator.analyze, repeat
+                )
+    return results
+
+
+def compare_with_history(
+    results: dict[str, float],
+    history_path: str,
+    regression_pct: float = DEFAULT_REGRESSION_PCT,
+    accept: bool = False,
+) -> list[str]:
+    """
+    与最近一次没有性能退化的记录比较，返回变慢超过regression_pct的项目，并把本次结果追加到历史记录\n
+    存在退化的记录不作为之后的比较基准，accept为True时表示接受本次的变慢，以本次结果作为新的基准
+    """
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+
+    regressions = []
+    baselines = [record for record in history if not record.get("regressions")]
+    if baselines:
+        previous = baselines[-1]["results"]
+        for name, seconds in results.items():
+            if name in previous and previous[name] > 0:
+                change_pct = (seconds / previous[name] - 1) * 100
+                if change_pct > regression_pct:
+                    regressions.append(
+                        f"{name}: {previous[name] * 1000:.2f}ms -> {seconds * 1000:.2f}ms (+{change_pct:.1f}%)"
+                    )
+
+    history.append(
+        {
+            "time": dt.datetime.now().isoformat(timespec="seconds"),
+            "results": results,
+            "regressions": [] if accept else regressions,
+        }
+    )
+    with open(history_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=4, ensure_ascii=False)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="指标计算和策略分析的基准测试")
+    parser.add_argument(
+        "--bars", type=int, nargs="*", default=BAR_SIZES, help="合成K线的长度"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    parser.add_argument(
+        "--history",
+        default=f"{__BASE_PATH__}\\benchmark_history.json",
+        help="历史记录文件",
+    )
+    parser.add_argument(
+        "--regression-pct",
+        type=float,
+        default=DEFAULT_REGRESSION_PCT,
+        help="变慢超过该百分比时视为性能退化",
+    )
+    parser.add_argument(
+        "--accept",
+        action="store_true",
+        help="接受本次的变慢，以本次结果作为之后的比较基准",
+    )
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(bar_sizes=args.bars, repeat=args.repeat)
+    for name, seconds in benchmark_results.items():
+        print(f"{name:<60}{seconds * 1000:>12.2f}ms")
+
+    regressions = compare_with_history(
+        benchmark_results, args.history, args.regression_pct, args.accept
+    )
+    for regression in regressions:
+        print(f"性能退化：{regression}")
+    sys.exit(1 if regressions and not args.accept else 0)
@@ -0,0 +1,71 @@
+"""indicator_pipeline.py 一个产品的全部指标一次计算：K线只读取一次，结果集中写出"""
+
+from pandas import DataFrame
+from utils.config_service import config_service
+from utils.data_cache import data_cache
+from utils.data_storage import WriteBatch
+from utils.enumeration_label import ProductType, IndicatorName
+from utils.indicator_registry import create_indicator
+from config import do_logging
+from typing import Optional
+
+import datetime as dt
+
+logger = do_logging()
+
+
+class IndicatorPipeline:
+    """
+    一个产品的指标流水线\n
+    K线只读取一次，各指标共享同一个product_df_dict\n
+    计算和分析的结果只暂存在内存中，全部完成后一次性写出文件和配置
+    """
+
+    def __init__(
+        self,
+        product_code: str,
+        today_date: Optional[dt.date] = None,
+        product_type: ProductType = ProductType.Stock,
+        indicator_names: Optional[list[IndicatorName]] = None,
+        product_df_dict: Optional[dict[str, DataFrame]] = None,
+    ) -> None:
+        self.product_code = product_code
+        self.today_date = today_date or dt.date.today()
+        self.product_type = product_type
+        self.indicator_names = indicator_names or list(IndicatorName)
+        self.product_df_dict = product_df_dict or data_cache.product_df_dict(
+            product_code=product_code,
+            today_date=self.today_date,
+            product_type=product_type,
+        )
+        self.write_batch = WriteBatch()
+
+    def run(self, flush: bool = True) -> dict[IndicatorName, list[DataFrame]]:
+        """计算全部指标并运行各自的策略，返回{指标名称: 策略结果}"""
+        results = {}
+        for indicator_name in self.indicator_names:
+            try:
+                indicator = create_indicator(
+                    indicator_name,
+                    product_code=self.product_code,
+                    today_date=self.today_date,
+                    product_type=self.product_type,
+                    product_df_dict=self.product_df_dict,
+                )
+            except ValueError as e:
+                logger.warning(f"跳过指标{indicator_name.value}\n>>>>{e}")
+                continue
+            indicator.write_batch = self.write_batch
+            # 计算结果由save_indicator()放入data_cache，analyze()中的get_dict()直接取用
+            indicator.calculate_indicator()
+            results[indicator_name] = indicator.analyze()
+
+        if flush:
+            self.flush()
+        return results
+
+    def flush(self) -> None:
+        """一次性写出暂存的指标、策略文件和配置"""
+        written = self.write_batch.flush()
+        config_service.flush()
+        logger.debug(f"{self.product_code}的流水线写出{len(written)}个文件")
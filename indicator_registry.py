@@ -0,0 +1,65 @@
+"""indicator_registry.py 按IndicatorName延迟加载指标类，只有用到某个指标时才导入它的模块"""
+
+from pandas import DataFrame
+from utils.enumeration_label import ProductType, IndicatorName
+from typing import TYPE_CHECKING, Optional
+
+import datetime as dt
+import importlib
+
+if TYPE_CHECKING:
+    from utils.myIndicator_abc import MyIndicator
+
+# 指标名称到"模块:类名"的映射
+# 未登记的指标按命名约定查找，例如IndicatorName.RSI对应utils.myRSI:MyRSI
+indicator_targets: dict[str, str] = {
+    IndicatorName.SRLine.value: "utils.mySRLine:MySRLine",
+}
+
+# 已加载的指标类
+_loaded_classes: dict[str, type["MyIndicator"]] = {}
+
+
+def register_indicator(indicator_name: IndicatorName, target: str) -> None:
+    """登记指标类的位置，target格式为"模块:类名"，不会立即导入"""
+    indicator_targets[indicator_name.value] = target
+    _loaded_classes.pop(indicator_name.value, None)
+
+
+def get_indicator_class(indicator_name: IndicatorName) -> type["MyIndicator"]:
+    """获取指标类，第一次获取时才导入对应模块"""
+    if indicator_name.value not in _loaded_classes:
+        target = indicator_targets.get(
+            indicator_name.value,
+            f"utils.my{indicator_name.value}:My{indicator_name.value}",
+        )
+        module_name, class_name = target.split(":")
+        try:
+            module = importlib.import_module(module_name)
+        except ModuleNotFoundError as e:
+            # 只处理指标模块本身不存在的情况，模块内部缺少依赖时原样抛出
+            if e.name != module_name:
+                raise
+            raise ValueError(
+                f"指标'{indicator_name.value}'的模块'{module_name}'不存在！"
+            ) from e
+        _loaded_classes[indicator_name.value] = getattr(module, class_name)
+    return _loaded_classes[indicator_name.value]
+
+
+def create_indicator(
+    indicator_name: IndicatorName,
+    product_code: str,
+    today_date: Optional[dt.date],
+    product_type: ProductType,
+    product_df_dict: Optional[dict[str, DataFrame]] = None,
+    data_path: Optional[str] = None,
+) -> "MyIndicator":
+    """创建指标对象，参数与各指标类的构造函数一致"""
+    return get_indicator_class(indicator_name)(
+        data_path=data_path,
+        today_date=today_date,
+        product_code=product_code,
+        product_type=product_type,
+        product_df_dict=product_df_dict,
+    )
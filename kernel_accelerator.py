@@ -0,0 +1,141 @@
+"""kernel_accelerator.py 逐根K线的状态机、递推类计算的加速层：安装了numba时编译执行，否则使用NumPy版本或原始的Python版本"""
+
+from config import do_logging
+from typing import Callable, Optional
+
+import functools
+import os
+
+import numpy as np
+
+logger = do_logging()
+
+# 设置该环境变量后不使用numba，用于排查编译后结果不一致的问题
+DISABLE_JIT_ENV = "GOINVEST_DISABLE_JIT"
+
+
+class JitKernel:
+    """
+    一个逐根K线的计算内核，py_func为Python参考实现，只使用标量循环和NumPy数组，写法需满足numba的nopython模式\n
+    第一次调用时尝试用numba.njit编译，没有安装numba、设置了GOINVEST_DISABLE_JIT或编译失败时，\n
+    使用fallback（通常是等价的NumPy向量化版本），没有fallback时直接执行py_func
+    """
+
+    def __init__(self, py_func: Callable, fallback: Optional[Callable] = None) -> None:
+        functools.update_wrapper(self, py_func)
+        self.py_func = py_func
+        self.fallback = fallback
+        self._compiled: Optional[Callable] = None
+        self._compile_tried = False
+
+    def _compile(self) -> Optional[Callable]:
+        if self._compile_tried:
+            return self._compiled
+        self._compile_tried = True
+        if os.environ.get(DISABLE_JIT_ENV):
+            return None
+        try:
+            from numba import njit
+        except ImportError:
+            logger.debug(f"未安装numba，{self.py_func.__name__}不编译执行")
+            return None
+        self._compiled = njit(cache=True)(self.py_func)
+        return self._compiled
+
+    @property
+    def backend(self) -> str:
+        """当前使用的实现：numba、numpy或python"""
+        if self._compile() is not None:
+            return "numba"
+        return "numpy" if self.fallback is not None else "python"
+
+    def __call__(self, *args):
+        compiled = self._compile()
+        if compiled is not None:
+            try:
+                return compiled(*args)
+            except Exception as e:
+                # numba在第一次调用时才按参数类型编译，类型推断失败时不再尝试
+                logger.warning(
+                    f"{self.py_func.__name__}编译执行失败，改用未编译的版本\n>>>>{e}"
+                )
+                self._compiled = None
+        if self.fallback is not None:
+            return self.fallback(*args)
+        return self.py_func(*args)
+
+
+def jit_kernel(fallback: Optional[Callable] = None) -> Callable:
+    """
+    装饰器，将逐根K线的Python函数包装为JitKernel，例如\n
+    @jit_kernel(fallback=my_numpy_version)\n
+    def my_kernel(close, window): ...
+    """
+
+    def decorator(py_func: Callable) -> JitKernel:
+        return JitKernel(py_func, fallback)
+
+    return decorator
+
+
+def check_parity(
+    kernel: JitKernel, *args, rtol: float = 1e-9, atol: float = 1e-12
+) -> bool:
+    """
+    核对内核当前实现（编译版或NumPy版）与Python参考实现的结果，返回是否一致\n
+    在开发新内核、升级numba后调用，不一致时输出两者差异最大的位置
+    """
+    expected = np.asarray(kernel.py_func(*args))
+    actual = np.asarray(kernel(*args))
+    if expected.shape != actual.shape:
+        logger.warning(
+            f"{kernel.__name__}（{kernel.backend}）的结果形状{actual.shape}与参考实现{expected.shape}不同"
+        )
+        return False
+    same = np.allclose(
+        actual.astype(np.float64),
+        expected.astype(np.float64),
+        rtol=rtol,
+        atol=atol,
+        equal_nan=True,
+    )
+    if not same:
+        diff = np.abs(actual.astype(np.float64) - expected.astype(np.float64))
+        position = int(np.nanargmax(diff)) if np.isfinite(diff).any() else 0
+        logger.warning(
+            f"{kernel.__name__}（{kernel.backend}）与参考实现不一致，"
+            f"位置{position}：{actual.flat[position]} != {expected.flat[position]}"
+        )
+    return same
+
+
+def _met_line_state_numpy(
+    support_event: np.ndarray, resistance_event: np.ndarray, initial_state: int
+) -> np.ndarray:
+    """met_line状态机的NumPy版本：交叉事件前向填充"""
+    n = len(support_event)
+    event = np.where(resistance_event, 2, np.where(support_event, 1, 0))
+    event = np.concatenate([[initial_state], event]).astype(np.int8)
+    last_event_pos = np.maximum.accumulate(np.where(event > 0, np.arange(n + 1), 0))
+    return event[last_event_pos][1:]
+
+
+@jit_kernel(fallback=_met_line_state_numpy)
+def met_line_state(
+    support_event: np.ndarray, resistance_event: np.ndarray, initial_state: int
+) -> np.ndarray:
+    """
+    压力区策略的met_line状态机：0为undefined，1为support，2为resistance\n
+    遇到支撑线交叉进入support，遇到阻力线交叉进入resistance，同一天两者都有时阻力线优先\n
+    initial_state为之前的状态，分块计算时传入上一块最后的状态
+    """
+    n = len(support_event)
+    state = np.empty(n, dtype=np.int8)
+    current = initial_state
+    for i in range(n):
+        if resistance_event[i]:
+            current = 2
+        elif support_event[i]:
+            current = 1
+        state[i] = current
+    return state
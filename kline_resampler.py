@@ -0,0 +1,88 @@
+"""kline_resampler.py 由日K线在本地合成周K线、月K线，不再单独下载"""
+
+from pandas import DataFrame
+
+import pandas as pd
+
+# 周期名称对应的pandas周期，A股周一至周五交易，周K按自然周（周一至周日）划分
+PERIOD_FREQ = {
+    "weekly": "W-SUN",
+    "monthly": "M",
+    "quarterly": "Q",
+    "yearly": "Y",
+}
+
+# 各列的合并方式，未列出的列取最后一个值
+COLUMN_AGG = {
+    "开盘": "first",
+    "收盘": "last",
+    "最高": "max",
+    "最低": "min",
+    "成交量": "sum",
+    "成交额": "sum",
+    "换手率": "sum",
+}
+
+
+class KlineResampler:
+    """K线周期转换"""
+
+    @staticmethod
+    def resample(daily_df: DataFrame, period: str) -> DataFrame:
+        """
+        将日K线合成为period周期的K线，日期为该周期内最后一个交易日\n
+        涨跌额、涨跌幅、振幅按上一周期的收盘价重新计算
+        """
+        if period == "daily":
+            return daily_df
+        if period not in PERIOD_FREQ:
+            raise ValueError(
+                f"不支持的周期'{period}'，可选：{list(PERIOD_FREQ.keys())}"
+            )
+
+        group_key = pd.DatetimeIndex(daily_df.index).to_period(PERIOD_FREQ[period])
+        grouped = daily_df.groupby(group_key, sort=True)
+        df_period = grouped.agg(
+            {col: COLUMN_AGG.get(col, "last") for col in daily_df.columns}
+        )
+        # 以该周期最后一个交易日为日期
+        df_period.index = pd.DatetimeIndex(
+            daily_df.index.to_series().groupby(group_key, sort=True).max().values,
+            name=daily_df.index.name,
+        )
+
+        if "收盘" in daily_df.columns:
+            # 上一周期的收盘价，即本周期第一个交易日的前一日收盘价
+            prev_close = (
+                daily_df["收盘"].shift(1).groupby(group_key, sort=True).first().values
+            )
+            if "涨跌额" in df_period.columns:
+                df_period["涨跌额"] = df_period["收盘"] - prev_close
+            if "涨跌幅" in df_period.columns:
+                df_period["涨跌幅"] = (df_period["收盘"] / prev_close - 1) * 100
+            if {"振幅", "最高", "最低"} <= set(df_period.columns):
+                df_period["振幅"] = (
+                    (df_period["最高"] - df_period["最低"]) / prev_close * 100
+                )
+
+        return df_period
+
+    @staticmethod
+    def fill_periods(
+        product_df_dict: dict[str, DataFrame], periods: list[str]
+    ) -> dict[str, DataFrame]:
+        """返回补齐了periods中缺少周期的新字典，缺少的周期由日K线合成"""
+        missing_periods = [
+            period for period in periods if period not in product_df_dict
+        ]
+        if not missing_periods:
+            return product_df_dict
+        if "daily" not in product_df_dict:
+            raise KeyError("缺少日K线，无法合成其他周期！")
+        return {
+            **product_df_dict,
+            **{
+                period: KlineResampler.resample(product_df_dict["daily"], period)
+                for period in missing_periods
+            },
+        }
@@ -0,0 +1,78 @@
+"""kline_schema.py K线数据的列类型约定：载入时统一为紧凑的数据类型并做基本校验"""
+
+from pandas import DataFrame
+
+import numpy as np
+import pandas as pd
+
+# 价格类的列，使用precision对应的精度
+PRICE_COLUMNS = ["开盘", "收盘", "最高", "最低"]
+# 成交量为整数（手），停牌的K线没有成交量，记为0
+# 其余数值列（成交额、振幅、涨跌幅等）数值范围大或需要保留小数，保持float64
+INTEGER_COLUMNS = ["成交量"]
+# 载入时必须存在的列
+REQUIRED_COLUMNS = ["收盘"]
+
+# 可选的精度，默认float32，对精度敏感的指标可以选择float64
+KLINE_PRECISIONS = {"float32": np.float32, "float64": np.float64}
+DEFAULT_PRECISION = "float32"
+
+# 策略判断值的数据类型
+JUDGE_DTYPE = np.float32
+
+
+def normalize_kline(df: DataFrame, precision: str = DEFAULT_PRECISION) -> DataFrame:
+    """
+    将一个周期的K线转换为约定的数据类型，校验不通过时抛出ValueError\n
+    索引转换为名为“日期”的datetime64，价格列为precision对应的浮点类型，成交量为int64（缺失值记为0），\n
+    其他数值列为float64\n
+    数据类型已符合约定的列不会被复制
+    """
+    if precision not in KLINE_PRECISIONS:
+        raise ValueError(
+            f"不支持的精度'{precision}'，可选：{list(KLINE_PRECISIONS.keys())}"
+        )
+    float_dtype = KLINE_PRECISIONS[precision]
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"K线缺少必要的列：{missing_columns}")
+
+    try:
+        index = pd.DatetimeIndex(df.index, name="日期")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"K线的索引无法转换为日期\n>>>>{e}")
+    if index.has_duplicates:
+        raise ValueError(f"K线的日期重复：{list(index[index.duplicated()][:5])}")
+    if not index.is_monotonic_increasing:
+        raise ValueError("K线的日期没有按升序排列！")
+
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col in INTEGER_COLUMNS:
+            try:
+                values = pd.to_numeric(series)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"K线的'{col}'列无法转换为数值\n>>>>{e}")
+            # 停牌的K线成交量缺失，记为0
+            if values.isna().any():
+                values = values.fillna(0)
+            columns[col] = values.to_numpy(dtype=np.int64, copy=False)
+        elif col in PRICE_COLUMNS or pd.api.types.is_numeric_dtype(series.dtype):
+            target_dtype = float_dtype if col in PRICE_COLUMNS else np.float64
+            try:
+                columns[col] = series.to_numpy(dtype=target_dtype, copy=False)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"K线的'{col}'列无法转换为数值\n>>>>{e}")
+        else:
+            columns[col] = series.to_numpy(copy=False)
+
+    return DataFrame(columns, index=index, columns=df.columns, copy=False)
+
+
+def normalize_df_dict(
+    df_dict: dict[str, DataFrame], precision: str = DEFAULT_PRECISION
+) -> dict[str, DataFrame]:
+    """对K线字典中的每个周期调用normalize_kline()"""
+    return {period: normalize_kline(df, precision) for period, df in df_dict.items()}
@@ -0,0 +1,309 @@
+"""kline_stream.py 分块流式计算：K线按固定行数分块读入，指标和策略跨块保留状态，结果逐块写出"""
+
+from pandas import DataFrame
+from utils.cross_detector import CrossDetector
+from utils.kernel_accelerator import met_line_state
+from utils.mySRLine import MySRLine
+from utils.sliding_srline import SlidingSRLineFitter
+from config import do_logging
+from typing import Iterable, Iterator, Optional, Union
+
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = do_logging()
+
+
+def iter_kline_chunks(
+    source: Union[str, DataFrame, Iterable[DataFrame]], chunk_size: int = 100_000
+) -> Iterator[DataFrame]:
+    """
+    按chunk_size行分块返回K线，source可以是：\n
+    csv文件路径（第一列为日期索引，以read_csv的chunksize读取，不会一次读入整个文件）；\n
+    已在内存中的DataFrame（按行切片，不复制）；\n
+    或者已经分好块的DataFrame迭代器（原样返回）
+    """
+    if isinstance(source, str):
+        with pd.read_csv(
+            source,
+            index_col=0,
+            parse_dates=True,
+            encoding="utf-8",
+            chunksize=chunk_size,
+        ) as reader:
+            yield from reader
+    elif isinstance(source, DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start : start + chunk_size]
+    else:
+        yield from source
+
+
+class SharedSeriesStats:
+    """
+    同一条收盘价序列上的滚动统计量，按参数缓存\n
+    滚动均值与滚动标准差共用同一组前缀和\n
+    缺失值的处理与pandas的rolling()一致：只有包含缺失值的窗口结果为nan
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        self.values = np.asarray(values, dtype=np.float64)
+        self._cache: dict[tuple, np.ndarray] = {}
+        valid = ~np.isnan(self.values)
+        # 减去均值后再求前缀和，减小长序列上的舍入误差
+        self._offset = float(self.values[valid].mean()) if valid.any() else 0.0
+        centered = self.values - self._offset
+        # 缺失值按0累加，另外累计有效值的个数，用于判断窗口内是否有缺失值
+        self._cumsum = np.concatenate([[0.0], np.nancumsum(centered)])
+        self._cumsum_sq = np.concatenate([[0.0], np.nancumsum(centered**2)])
+        self._cumcount = np.concatenate([[0], np.cumsum(valid)])
+
+    def _complete_windows(self, window: int) -> np.ndarray:
+        """每个长度为window的窗口是否没有缺失值，对应结果的第window-1个值之后"""
+        return self._cumcount[window:] - self._cumcount[:-window] == window
+
+    def _cached(self, key: tuple, compute) -> np.ndarray:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        """滚动均值，前window-1个值为nan"""
+
+        def compute() -> np.ndarray:
+            result = np.full(len(self.values), np.nan)
+            if window <= len(self.values):
+                window_sum = self._cumsum[window:] - self._cumsum[:-window]
+                result[window - 1 :] = np.where(
+                    self._complete_windows(window),
+                    window_sum / window + self._offset,
+                    np.nan,
+                )
+            return result
+
+        return self._cached(("mean", window), compute)
+
+    def rolling_std(self, window: int, ddof: int = 1) -> np.ndarray:
+        """滚动标准差，与pandas的rolling().std(ddof)一致"""
+
+        def compute() -> np.ndarray:
+            result = np.full(len(self.values), np.nan)
+            if window <= len(self.values) and window > ddof:
+                window_sum = self._cumsum[window:] - self._cumsum[:-window]
+                window_sum_sq = self._cumsum_sq[window:] - self._cumsum_sq[:-window]
+                variance = (window_sum_sq - window_sum**2 / window) / (window - ddof)
+                result[window - 1 :] = np.where(
+                    self._complete_windows(window),
+                    np.sqrt(np.maximum(variance, 0.0)),
+                    np.nan,
+                )
+            return result
+
+        return self._cached(("std", window, ddof), compute)
+
+
+class RollingWindowState:
+    """
+    跨块的滚动窗口状态，只保留上一块末尾的window-1个值\n
+    每块的计算在“保留值+本块”上进行，结果与整段计算相同，包含缺失值的窗口在两种方式下都为nan
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._tail = np.empty(0)
+
+    def _extend(self, values: np.ndarray) -> tuple[SharedSeriesStats, int]:
+        extended = np.concatenate([self._tail, np.asarray(values, dtype=np.float64)])
+        offset = len(self._tail)
+        self._tail = extended[len(extended) - min(len(extended), self.window - 1) :]
+        return SharedSeriesStats(extended), offset
+
+    def mean(self, values: np.ndarray) -> np.ndarray:
+        """滚动均值"""
+        stats, offset = self._extend(values)
+        return stats.rolling_mean(self.window)[offset:]
+
+    def mean_std(
+        self, values: np.ndarray, ddof: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """滚动均值和滚动标准差，两者共用同一组前缀和"""
+        stats, offset = self._extend(values)
+        return (
+            stats.rolling_mean(self.window)[offset:],
+            stats.rolling_std(self.window, ddof)[offset:],
+        )
+
+
+class EmaState:
+    """跨块的指数移动平均状态，与pandas的ewm(span, adjust=False).mean()一致"""
+
+    def __init__(self, span: int) -> None:
+        self.span = span
+        self._last: Optional[float] = None
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return values
+        if self._last is None:
+            ema = pd.Series(values).ewm(span=self.span, adjust=False).mean().values
+        else:
+            # 以上一块的最后一个EMA值作为起点继续递推
+            ema = (
+                pd.Series(np.concatenate([[self._last], values]))
+                .ewm(span=self.span, adjust=False)
+                .mean()
+                .values[1:]
+            )
+        self._last = float(ema[-1])
+        return ema
+
+
+class StreamingCrossState:
+    """
+    跨块的交叉检测，保存价格位于线上方还是下方\n
+    规则与CrossDetector.cross_events()相同：恰好落在线上时沿用之前的方向
+    """
+
+    def __init__(self) -> None:
+        self._last_side = 0.0
+
+    def update(self, line: np.ndarray, price: np.ndarray) -> np.ndarray:
+        """返回本块的交叉事件，上穿为1，下穿为-1，其余为0"""
+        # 在本块前面补一根虚拟K线，携带上一块最后的方向
+        side = CrossDetector._side(
+            pd.Series(np.concatenate([[0.0], line])),
+            pd.Series(np.concatenate([[self._last_side], price])),
+        )
+        events = np.zeros(len(side), dtype=np.int8)
+        changed = (side[1:] != side[:-1]) & (side[1:] != 0) & (side[:-1] != 0)
+        events[1:][changed] = side[1:][changed]
+        self._last_side = float(side[-1])
+        return events[1:]
+
+
+class StreamingPressureAreaJudge:
+    """
+    压力区策略的流式版本，met_line状态和交叉方向跨块保留\n
+    支撑/阻力线相同时，逐块的结果与MySRLine._pressure_area_judge()的整段结果一致
+    """
+
+    def __init__(self, area_num: int = 20) -> None:
+        self.area_num = area_num
+        self._support_cross = StreamingCrossState()
+        self._resistance_cross = StreamingCrossState()
+        self._met_line = 0
+
+    def update(
+        self,
+        closing_price: np.ndarray,
+        support_line: np.ndarray,
+        resistance_line: np.ndarray,
+    ) -> np.ndarray:
+        support_event = self._support_cross.update(support_line, closing_price) != 0
+        resistance_event = (
+            self._resistance_cross.update(resistance_line, closing_price) != 0
+        )
+        # 从上一块结束时的met_line状态继续
+        met_line = met_line_state(support_event, resistance_event, self._met_line)
+        if len(met_line):
+            self._met_line = int(met_line[-1])
+        return MySRLine._area_judge_from_state(
+            closing_price=closing_price,
+            support_line=support_line,
+            resistance_line=resistance_line,
+            met_line=met_line,
+            area_num=self.area_num,
+        )
+
+
+class StreamingSRLine:
+    """
+    滚动支撑/阻力线及压力区判断的流式计算，内存占用只与窗口长度有关\n
+    每块返回“支撑线”“阻力线”“判断值”三列，窗口未满时支撑/阻力线为nan、判断值为0
+    """
+
+    def __init__(
+        self, window: int = 250, threshold: float = 0.05, area_num: int = 20
+    ) -> None:
+        self.fitter = SlidingSRLineFitter(window, threshold)
+        self.judge = StreamingPressureAreaJudge(area_num)
+
+    def process(self, chunk: DataFrame, price_column: str = "收盘") -> DataFrame:
+        closing_price = chunk[price_column].to_numpy(dtype=np.float64)
+        support_line, resistance_line = self.fitter.update(closing_price)
+        df_result = DataFrame(
+            {
+                "支撑线": support_line,
+                "阻力线": resistance_line,
+                "判断值": self.judge.update(
+                    closing_price, support_line, resistance_line
+                ),
+            },
+            index=chunk.index,
+        )
+        df_result.index.name = "日期"
+        return df_result
+
+
+class StreamingSMA:
+    """多条简单移动平均线的流式计算，列名为均线长度"""
+
+    def __init__(self, windows: Iterable[int] = (5, 10, 20, 50, 150)) -> None:
+        self.states = {window: RollingWindowState(window) for window in windows}
+
+    def process(self, chunk: DataFrame, price_column: str = "收盘") -> DataFrame:
+        closing_price = chunk[price_column].to_numpy(dtype=np.float64)
+        df_result = DataFrame(
+            {
+                str(window): state.mean(closing_price)
+                for window, state in self.states.items()
+            },
+            index=chunk.index,
+        )
+        df_result.index.name = "日期"
+        return df_result
+
+
+class CsvAppendSink:
+    """逐块追加写入csv，第一块写入表头，已有的同名文件会被覆盖"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rows = 0
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df: DataFrame) -> None:
+        with open(self.path, mode="a", encoding="utf-8") as f:
+            df.to_csv(f, header=self.rows == 0, index=True)
+        self.rows += len(df)
+
+
+def run_stream(
+    source: Union[str, DataFrame, Iterable[DataFrame]],
+    processor,
+    sink: Optional[CsvAppendSink] = None,
+    chunk_size: int = 100_000,
+    price_column: str = "收盘",
+) -> Optional[DataFrame]:
+    """
+    逐块读取K线、计算并写出，processor为带process(chunk, price_column)方法的流式指标\n
+    传入sink时结果只写入sink，返回None，内存中最多同时存在一块数据；\n
+    不传sink时返回拼接后的全部结果
+    """
+    results = []
+    chunk_count = 0
+    for chunk in iter_kline_chunks(source, chunk_size):
+        df_result = processor.process(chunk, price_column)
+        chunk_count += 1
+        if sink is not None:
+            sink.write(df_result)
+        else:
+            results.append(df_result)
+    logger.debug(f"流式计算完成，共{chunk_count}块")
+    if sink is not None:
+        return None
+    return pd.concat(results) if results else DataFrame()
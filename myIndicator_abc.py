@@ -1,23 +1,70 @@
 """myIndicator_abc.py 扮演一个接口，写一些指标中共性功能"""
 
 from abc import ABC, abstractmethod
+from enum import Enum
 from pandas import DataFrame
-from utils import dataSource_picker as dp
+from utils.config_service import config_service
+from utils.data_cache import data_cache
+from utils.data_storage import get_storage, WriteBatch
 from utils.enumeration_label import ProductType, IndicatorName
+from utils.kline_resampler import KlineResampler
+from utils.kline_schema import DEFAULT_PRECISION, normalize_df_dict
+from utils.pipeline_profiler import pipeline_profiler
+from utils.result_graph import code_version, fingerprint_df_dict, result_graph
+from utils.screener import panel_recorder
 from config import __BASE_PATH__, do_logging
 from typing import Optional
 
-import json
-
 import datetime as dt
 import os
+import shutil
+
+import pandas as pd
 
 logger = do_logging()
 
 
+class UpdatePolicy(Enum):
+    """指标的增量更新方式"""
+
+    # 只计算新增的K线，向前多取warmup_bars根K线预热滚动窗口
+    Append = "append"
+    # 新数据会改变历史结果（例如整段拟合），每次整段重新计算
+    Refit = "refit"
+
+
 class MyIndicator(ABC):
     """一个指标的抽象类"""
 
+    # 增量更新方式，使用滚动窗口的指标可改为Append，并将warmup_bars设为最长窗口
+    update_policy: UpdatePolicy = UpdatePolicy.Refit
+    warmup_bars: int = 0
+    # 按日期命名的指标/策略文件的格式，dataPicker按csv读取，默认保持csv
+    storage_format: str = "csv"
+    # 增量更新使用的指标文件的格式
+    store_format: str = "npy"
+    # K线价格列的精度，对精度敏感的指标可改为"float64"
+    kline_precision: str = DEFAULT_PRECISION
+    # 由IndicatorPipeline设置：集中写出的暂存区
+    write_batch: Optional[WriteBatch] = None
+    # 除类所在模块外，计算结果还依赖的模块，源码变化时结果图中的旧结果失效
+    # 子类只需声明自己额外用到的模块，基类声明的模块会一并计入
+    _code_dependencies: tuple[str, ...] = (
+        "utils.kline_schema",
+        "utils.kline_resampler",
+    )
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # 为子类实现的计算函数和分析函数加上耗时记录
+        for func_name in ["calculate_indicator", "analyze"]:
+            if func_name in cls.__dict__:
+                setattr(
+                    cls,
+                    func_name,
+                    pipeline_profiler.timed(func_name)(cls.__dict__[func_name]),
+                )
+
     def __init__(
         self,
         data_path: Optional[str],
@@ -34,11 +81,32 @@ class MyIndicator(ABC):
         self.product_code = product_code
         self.product_type = product_type
         self.indicator_name = indicator_name
-        self.product_df_dict = product_df_dict or dp.dataPicker.product_source_picker(
-            product_code=product_code,
-            today_date=today_date,
-            product_type=product_type,
+        # 传入的K线同样按本指标的精度统一数据类型，类型已符合时不复制数据
+        self.product_df_dict = (
+            normalize_df_dict(product_df_dict, self.kline_precision)
+            if product_df_dict
+            else data_cache.product_df_dict(
+                product_code=product_code,
+                today_date=today_date,
+                product_type=product_type,
+                precision=self.kline_precision,
+            )
         )
+        # 增量计算时只传入部分K线，此时不输出按日期命名的csv文件
+        self._partial_calculation = False
+        # 结果图中K线节点和本指标节点的键，见result_graph.py
+        self._kline_key: Optional[tuple[tuple, str]] = None
+        self._indicator_key: Optional[str] = None
+
+    def get_period_df(self, period: str) -> DataFrame:
+        """
+        获取指定周期的K线，product_df_dict中没有的周期（如monthly）由日K线合成，不重新下载
+        """
+        if period not in self.product_df_dict:
+            self.product_df_dict = KlineResampler.fill_periods(
+                self.product_df_dict, [period]
+            )
+        return self.product_df_dict[period]
 
     def _remove_redundant_files(self) -> None:
         """
@@ -59,8 +127,11 @@ class MyIndicator(ABC):
                         # 取得文件绝对路径
                         absfile_path = os.path.join(indicator_path, file_name)
                         logger.debug(f"删除冗余文件\n>>>>{file_name}")
-                        # os.remove只能处理绝对路径
-                        os.remove(absfile_path)
+                        # os.remove只能处理绝对路径，npy格式保存为文件夹
+                        if os.path.isdir(absfile_path):
+                            shutil.rmtree(absfile_path)
+                        else:
+                            os.remove(absfile_path)
 
     @abstractmethod
     def calculate_indicator(self) -> dict[str, DataFrame]:
@@ -77,24 +148,32 @@ class MyIndicator(ABC):
         """
         pass
 
+    @pipeline_profiler.timed("save_indicator")
     def save_indicator(
-        self, df_dict: dict[str, DataFrame], indicator_value_config_dict: Optional[dict]
+        self,
+        df_dict: dict[str, DataFrame],
+        indicator_value_config_dict: Optional[dict],
+        fill_nan: bool = True,
     ) -> None:
         """
-        保存指标，可以在calculate_indicator()函数最后调用，自动将计算好的指标数据保存到csv文件
+        保存指标，可以在calculate_indicator()函数最后调用，自动将计算好的指标数据保存到文件（格式由storage_format决定）\n
+        fill_nan为False时保留nan值，用于前若干根K线没有指标值（预热期）的计算方式
         """
         for period in df_dict.keys():
             # 检查是否存在nan值
-            if df_dict[period].isnull().values.any():
+            if fill_nan and df_dict[period].isnull().values.any():
                 # 填充nan值
                 df_dict[period].fillna(value=0.0, inplace=True)
-            # 输出字典到csv文件
-            with open(
-                file=f"{self.data_path}\\indicator\\{self.product_code}{period[0].upper()}_{self.today_date.strftime('%Y%m%d')}_{self.indicator_name.value}.csv",
-                mode="w",
-                encoding="utf-8",
-            ) as f:
-                df_dict[period].to_csv(f, index=True, encoding="utf-8")
+            if self._partial_calculation:
+                continue
+            # 输出字典到文件，默认为csv
+            self._write_frame(
+                df_dict[period],
+                f"{self.data_path}\\indicator\\{self.product_code}{period[0].upper()}_{self.today_date.strftime('%Y%m%d')}_{self.indicator_name.value}",
+            )
+
+        if not self._partial_calculation:
+            self._register_indicator(df_dict, indicator_value_config_dict)
 
         if indicator_value_config_dict is not None:
             # 将指标配置写入配置文件
@@ -105,23 +184,220 @@ class MyIndicator(ABC):
                 strategy_config_dict=None,
             )
 
-    def get_dict(self) -> dict[str, DataFrame]:
+    def _register_indicator(
+        self, df_dict: dict[str, DataFrame], indicator_value_config_dict: Optional[dict]
+    ) -> None:
         """
-        一些机械的重复性工作，在analyze()函数内部，先调用本函数，获取指标数据
+        按实际使用的参数将完整的指标结果登记到结果图，参数、代码和K线不变时analyze()直接取用\n
+        同时更新缓存中的指标数据，并将最新的指标值记入筛选面板
         """
-        return_dict = dp.dataPicker.indicator_source_picker(
+        self._indicator_key = self.indicator_result_key(indicator_value_config_dict)
+        result_graph.store(
+            data_path=self.data_path,
+            key=self._indicator_key,
+            kind="indicator",
+            name=self.indicator_name.value,
+            parent_key=self.kline_result_key(),
+            params=indicator_value_config_dict,
+            df_dict=df_dict,
+            write_batch=self.write_batch,
+        )
+        data_cache.put_indicator(
             product_code=self.product_code,
             today_date=self.today_date,
             product_type=self.product_type,
             indicator_name=self.indicator_name,
-            product_df_dict=self.product_df_dict,
+            df_dict=df_dict,
+        )
+        panel_recorder.record_indicator(
+            self.product_code, self.indicator_name.value, df_dict
+        )
+
+    def update_indicator(self) -> dict[str, DataFrame]:
+        """
+        增量更新指标，结果保存在indicator_store文件夹中每个周期一个文件\n
+        update_policy为Append时，只计算上次结果之后的K线（最后一根K线总是重新计算）\n
+        update_policy为Refit或尚无历史结果时，整段重新计算
+        """
+        stored_dict = {
+            period: self._read_indicator_store(period)
+            for period in self.product_df_dict.keys()
+        }
+        if self.update_policy is UpdatePolicy.Refit or any(
+            df is None or df.empty for df in stored_dict.values()
+        ):
+            df_dict = self.calculate_indicator()
+        else:
+            df_dict = self._append_indicator(stored_dict)
+
+        for period, df in df_dict.items():
+            self._write_indicator_store(period, df)
+        return df_dict
+
+    def _append_indicator(
+        self, stored_dict: dict[str, DataFrame]
+    ) -> dict[str, DataFrame]:
+        """只计算新增K线，拼接到已保存的指标数据之后"""
+        full_df_dict = self.product_df_dict
+        partial_df_dict = {}
+        new_start_dict = {}
+        for period, df in full_df_dict.items():
+            stored = stored_dict[period]
+            # 只保留仍然存在于K线中的日期，最后一根K线可能尚未走完，需要重新计算
+            kept_index = stored.index[stored.index.isin(df.index)][:-1]
+            new_start = (
+                df.index.searchsorted(kept_index[-1], side="right")
+                if len(kept_index) > 0
+                else 0
+            )
+            new_start_dict[period] = new_start
+            # 向前多取warmup_bars根K线，保证滚动窗口完整
+            partial_df_dict[period] = df.iloc[max(0, new_start - self.warmup_bars) :]
+
+        logger.debug(
+            f"增量计算{self.product_code}的{self.indicator_name.value}\n>>>>"
+            + "，".join(
+                f"{period}新增{len(df) - new_start_dict[period]}根"
+                for period, df in full_df_dict.items()
+            )
+        )
+
+        self.product_df_dict = partial_df_dict
+        self._partial_calculation = True
+        try:
+            partial_result = self.calculate_indicator()
+        finally:
+            self.product_df_dict = full_df_dict
+            self._partial_calculation = False
+
+        df_dict = {}
+        for period, df in full_df_dict.items():
+            new_start = new_start_dict[period]
+            if new_start >= len(df):
+                df_dict[period] = stored_dict[period]
+                continue
+            first_new_date = df.index[new_start]
+            stored = stored_dict[period]
+            df_dict[period] = pd.concat(
+                [
+                    stored.loc[stored.index < first_new_date],
+                    partial_result[period].loc[
+                        partial_result[period].index >= first_new_date
+                    ],
+                ]
+            )
+
+        # 拼接后的结果与整段计算相同，按完整K线的指纹登记，analyze()不必整段重新计算
+        self._register_indicator(df_dict, self.read_from_config(None))
+        return df_dict
+
+    def _indicator_store_stem(self, period: str) -> str:
+        """增量更新使用的指标文件（不含后缀），不带日期，不会被_remove_redundant_files()删除"""
+        return f"{self.data_path}\\indicator_store\\{self.product_code}{period[0].upper()}_{self.indicator_name.value}"
+
+    def _read_indicator_store(self, period: str) -> Optional[DataFrame]:
+        """读取增量更新使用的指标文件，不存在时返回None"""
+        storage = get_storage(self.store_format)
+        store_stem = self._indicator_store_stem(period)
+        if not storage.exists(store_stem):
+            return None
+        return storage.read(store_stem)
+
+    def _write_indicator_store(self, period: str, df: DataFrame) -> None:
+        """保存增量更新使用的指标文件"""
+        os.makedirs(f"{self.data_path}\\indicator_store", exist_ok=True)
+        get_storage(self.store_format).write(df, self._indicator_store_stem(period))
+
+    def _write_frame(self, df: DataFrame, path_stem: str) -> str:
+        """按storage_format写出指标或策略文件，设置了write_batch时只登记，稍后集中写出"""
+        if self.write_batch is not None:
+            return self.write_batch.add(self.storage_format, df, path_stem)
+        return get_storage(self.storage_format).write(df, path_stem)
+
+    def kline_result_key(self) -> str:
+        """结果图中K线节点的键，即K线的内容指纹，K线对象不变时只计算一次"""
+        frame_ids = tuple(
+            (period, id(df)) for period, df in self.product_df_dict.items()
+        )
+        if self._kline_key is None or self._kline_key[0] != frame_ids:
+            self._kline_key = (frame_ids, fingerprint_df_dict(self.product_df_dict))
+        return self._kline_key[1]
+
+    def indicator_result_key(self, indicator_value_config_dict: Optional[dict]) -> str:
+        """
+        结果图中本指标节点的键，由K线指纹、指标名称、指标参数和代码版本决定\n
+        配置中与指标放在一起的策略配置不影响指标的结果，不计入键
+        """
+        if indicator_value_config_dict is not None:
+            indicator_value_config_dict = {
+                key: value
+                for key, value in indicator_value_config_dict.items()
+                if not (isinstance(value, dict) and "strategy_name" in value)
+            }
+        return result_graph.node_key(
+            parent_key=self.kline_result_key(),
+            kind="indicator",
+            name=self.indicator_name.value,
+            params=indicator_value_config_dict,
+            version=code_version(type(self)),
+        )
+
+    def strategy_result_key(
+        self, func_name: str, strategy_config_value_dict: Optional[dict]
+    ) -> str:
+        """结果图中策略节点的键，上游为本指标节点"""
+        return result_graph.node_key(
+            parent_key=self._indicator_key or self._configured_indicator_key(),
+            kind="strategy",
+            name=f"{self.indicator_name.value}{func_name}",
+            params=strategy_config_value_dict,
+            version=code_version(type(self)),
+        )
+
+    def _configured_indicator_key(self) -> str:
+        """按配置文件中的指标参数计算本指标节点的键"""
+        return self.indicator_result_key(self.read_from_config(None))
+
+    def load_strategy(
+        self, func_name: str, strategy_config_value_dict: Optional[dict]
+    ) -> Optional[DataFrame]:
+        """
+        在策略函数读取参数之后调用，指标结果、策略参数和代码都没有变化时返回上次的策略结果，否则返回None
+        """
+        df_dict = result_graph.load(
+            self.data_path,
+            self.strategy_result_key(func_name, strategy_config_value_dict),
+        )
+        if df_dict is None:
+            return None
+        panel_recorder.record_strategy(
+            self.product_code, self.indicator_name.value, func_name, df_dict["judge"]
         )
+        return df_dict["judge"]
+
+    def get_dict(self) -> dict[str, DataFrame]:
+        """
+        一些机械的重复性工作，在analyze()函数内部，先调用本函数，获取指标数据\n
+        按K线、指标参数和代码版本在结果图中查找，找不到时重新计算指标
+        """
+        self._indicator_key = self._configured_indicator_key()
+        return_dict = result_graph.load(self.data_path, self._indicator_key)
+        if return_dict is None:
+            logger.debug(
+                f"{self.product_code}的{self.indicator_name.value}没有可用的结果，重新计算"
+            )
+            return_dict = self.calculate_indicator()
+        else:
+            panel_recorder.record_indicator(
+                self.product_code, self.indicator_name.value, return_dict
+            )
 
         if any(df.empty for df in return_dict.values()):
             raise ValueError("技术指标数据为空！")
 
         return return_dict
 
+    @pipeline_profiler.timed("save_strategy")
     def save_strategy(
         self,
         df_judge: DataFrame,
@@ -132,15 +408,28 @@ class MyIndicator(ABC):
         输出df_sma_judge为csv文件，在strategy文件夹中\n
         在analyze()函数所调用的具体策略函数末尾，可以调用save_strategy()函数，保存分析结果
         """
-        with open(
-            f"{self.data_path}\\strategy\\{self.product_code}_{self.indicator_name.value}{func_name}_anlysis.csv",
-            "w",
-            encoding="utf-8",
-        ) as f:
-            df_judge.to_csv(f)
-            logger.debug(
-                f"查看{self.product_code}的'{self.indicator_name.value}{func_name}'分析结果\n>>>>{f.name}\n"
-            )
+        strategy_path = self._write_frame(
+            df_judge,
+            f"{self.data_path}\\strategy\\{self.product_code}_{self.indicator_name.value}{func_name}_anlysis",
+        )
+        logger.debug(
+            f"查看{self.product_code}的'{self.indicator_name.value}{func_name}'分析结果\n>>>>{strategy_path}\n"
+        )
+        # 最新的判断值记入筛选面板
+        panel_recorder.record_strategy(
+            self.product_code, self.indicator_name.value, func_name, df_judge
+        )
+        strategy_key = self.strategy_result_key(func_name, strategy_config_value_dict)
+        result_graph.store(
+            data_path=self.data_path,
+            key=strategy_key,
+            kind="strategy",
+            name=f"{self.indicator_name.value}{func_name}",
+            parent_key=self._indicator_key or self._configured_indicator_key(),
+            params=strategy_config_value_dict,
+            df_dict={"judge": df_judge},
+            write_batch=self.write_batch,
+        )
 
         if strategy_config_value_dict is not None:
             # 将策略配置写入配置文件
@@ -172,60 +461,22 @@ class MyIndicator(ABC):
             strategy_config_dict[key] = value
         return strategy_config_dict
 
+    @pipeline_profiler.timed("write_to_config")
     def write_to_config(
         self,
         indicator_config_dict: Optional[dict],
         strategy_config_dict: Optional[dict],
     ):
-        """将数据写入配置文件"""
-        config_path = f"{__BASE_PATH__}\\config.json"
-        # 读取配置文件
-        with open(config_path, "r") as f:
-            config_data = json.load(f)
-        # 查找键"ValueInCalculation"
-        if "ValueInCalculation" not in config_data.keys():
-            raise KeyError("键'ValueInCalculation'不存在！")
-        else:
-            if indicator_config_dict is not None:
-                # 将指标配置写入字典
-                config_data["ValueInCalculation"][
-                    f"{self.indicator_name.value}"
-                ] = indicator_config_dict
-            if strategy_config_dict is not None:
-                # 将策略配置写入字典
-                config_data["ValueInCalculation"][f"{self.indicator_name.value}"][
-                    f"{strategy_config_dict['strategy_name']}"
-                ] = strategy_config_dict
-
-        # 保存回文件
-        with open(config_path, "w") as f:
-            json.dump(config_data, f, indent=4)
+        """将数据写入配置文件，写入先合并在内存中，由config_service.flush()统一保存"""
+        config_service.write(
+            indicator_name=f"{self.indicator_name.value}",
+            indicator_config_dict=indicator_config_dict,
+            strategy_config_dict=strategy_config_dict,
+        )
 
     def read_from_config(self, strategy_name: Optional[str]):
         """从配置文件中读取数据"""
-        config_path = f"{__BASE_PATH__}\\config.json"
-        # 读取配置文件
-        with open(config_path, "r") as f:
-            config_data = json.load(f)
-        # 查找键"ValueInCalculation"
-        if "ValueInCalculation" not in config_data.keys():
-            raise KeyError("键'ValueInCalculation'不存在！")
-        else:
-            if strategy_name is None:
-                try:
-                    return config_data["ValueInCalculation"][
-                        f"{self.indicator_name.value}"
-                    ]
-                except KeyError:
-                    return None
-            else:
-                try:
-                    strategy_data = config_data["ValueInCalculation"][
-                        f"{self.indicator_name.value}"
-                    ][f"{strategy_name}"]
-                    # 删除策略名称
-                    del strategy_data["strategy_name"]
-
-                    return strategy_data
-                except KeyError:
-                    return None
+        return config_service.read(
+            indicator_name=f"{self.indicator_name.value}",
+            strategy_name=None if strategy_name is None else f"{strategy_name}",
+        )
@@ -10,14 +10,17 @@ if __name__ == "__main__":
 
 import datetime as dt
 import numpy as np
-import matplotlib.dates as mdates
 import pandas as pd
 
+from concurrent.futures import ProcessPoolExecutor
 from pandas import DataFrame, Series
+from utils.cross_detector import CrossDetector
 from utils.data_functionalizer import DataFunctionalizer as dfunc
-from utils.myIndicator_abc import MyIndicator
+from utils.myIndicator_abc import MyIndicator, UpdatePolicy
+from utils.sliding_srline import SlidingSRLineFitter
 from utils.enumeration_label import ProductType, IndicatorName
-from matplotlib import pyplot as plt
+from utils.kernel_accelerator import met_line_state
+from utils.kline_schema import JUDGE_DTYPE
 from typing import Optional
 
 # 本指标的参数
@@ -25,6 +28,16 @@ params = {}
 
 
 class MySRLine(MyIndicator):
+    # 支撑/阻力线由整段历史拟合，新增K线会改变历史结果，只能整段重新计算
+    update_policy = UpdatePolicy.Refit
+    # 拟合、交叉检测和策略状态机所在的模块
+    _code_dependencies = (
+        "utils.data_functionalizer",
+        "utils.sliding_srline",
+        "utils.cross_detector",
+        "utils.kernel_accelerator",
+    )
+
     def __init__(
         self,
         data_path: Optional[str],
@@ -51,7 +64,12 @@ class MySRLine(MyIndicator):
         super()._remove_redundant_files()
 
         # 本指标的参数
-        default_indicator_config_value = {"threshold": 0.05}
+        # mode为"full"时整段历史拟合一条直线，为"walk_forward"时每根K线只用最近window根K线拟合
+        default_indicator_config_value = {
+            "threshold": 0.05,
+            "mode": "full",
+            "window": 250,
+        }
         indicator_config_value = (
             super().read_from_config(None) or default_indicator_config_value
         )
@@ -64,85 +82,130 @@ class MySRLine(MyIndicator):
 
         # 根据数据和计算支撑/阻力线
         for period in ["daily", "weekly"]:
-            closing_price = self.product_df_dict[period]["收盘"]
-            closing_price_x = np.array(
-                [mdates.date2num(close_x) for close_x in closing_price.index]
-            )
-
-            # 对数据进行线性变换
-            transed_data, coeff = dfunc.shearing_and_recover(closing_price)
-
-            # 取transed_data的最大值和最小值
-            threshold = indicator_config_value["threshold"]  # config
-            # 拟合点数量
-            fit_points_num = int(len(transed_data) * threshold)
-            # 取点
-            max_points = transed_data.nlargest(fit_points_num)
-            min_points = transed_data.nsmallest(fit_points_num)
-
-            # 将max_points和min_points所代表的Series转化为np数组，方便拟合
-            max_points_y = np.array(max_points.values)
-            max_points_x = np.array(
-                [mdates.date2num(date) for date in max_points.index]
-            )
-            min_points_y = np.array(min_points.values)
-            min_points_x = np.array(
-                [mdates.date2num(date) for date in min_points.index]
-            )
-
-            # 拟合阻力线
-            resistance_coeff = np.polyfit(max_points_x, max_points_y, deg=1)
-            # 根据resistance_coeff计算出拟合的阻力线的y值
-            resistance_y = np.polyval(resistance_coeff, closing_price_x)
-            # 根据y值和max_points.index创建一个Series
-            resistance_line_data = Series(index=closing_price.index, data=resistance_y)
-
-            # 拟合支撑线
-            support_coeff = np.polyfit(min_points_x, min_points_y, deg=1)
-            # 根据support_coeff计算出拟合的支撑线的y值
-            support_y = np.polyval(support_coeff, closing_price_x)
-            # 根据y值和min_points.index创建一个Series
-            support_line_data = Series(index=closing_price.index, data=support_y)
-
-            # 阻力线逆变换
-            original_resistance_line_data = dfunc.shearing_and_recover(
-                resistance_line_data, coeff=coeff
-            )
-            # 支撑线逆变换
-            original_support_line_data = dfunc.shearing_and_recover(
-                support_line_data, coeff=coeff
-            )
-
-            # # 画出拟合的直线和原数据
-            # plt.plot(closing_price.index, closing_price, label="Smoothed Data")
-            # plt.plot(
-            #     original_resistance_line_data.index,
-            #     original_resistance_line_data,
-            #     label="Resistance Line",
-            # )
-            # plt.plot(
-            #     original_support_line_data.index,
-            #     original_support_line_data,
-            #     label="Support Line",
-            # )
-            # plt.legend()
-            # plt.show()
-
-            # 创建DataFrame
-            df_srline_dict[period] = DataFrame(
-                index=closing_price.index, columns=["支撑线", "阻力线"]
-            )
-            df_srline_dict[period]["支撑线"] = original_support_line_data
-            df_srline_dict[period]["阻力线"] = original_resistance_line_data
-            df_srline_dict[period].index.name = "日期"
-
-        # 保存指标
+            # 旧的配置中没有mode，按整段拟合处理
+            if indicator_config_value.get("mode", "full") == "walk_forward":
+                df_srline_dict[period] = MySRLine._fit_srline_walk_forward(
+                    closing_price=self.product_df_dict[period]["收盘"],
+                    threshold=indicator_config_value["threshold"],  # config
+                    window=indicator_config_value["window"],  # config
+                )
+            else:
+                df_srline_dict[period] = MySRLine._fit_srline(
+                    closing_price=self.product_df_dict[period]["收盘"],
+                    threshold=indicator_config_value["threshold"],  # config
+                )
+
+        # 保存指标，滚动拟合的预热期保持为nan，不能填充为0（否则会被当作与价格交叉）
         super().save_indicator(
-            df_dict=df_srline_dict, indicator_value_config_dict=indicator_config_value
+            df_dict=df_srline_dict,
+            indicator_value_config_dict=indicator_config_value,
+            fill_nan=indicator_config_value.get("mode", "full") != "walk_forward",
         )
         # 返回df_srline_dict
         return df_srline_dict
 
+    @staticmethod
+    def _dates_to_num(date_index: pd.Index) -> np.ndarray:
+        """
+        将日期索引一次性转换为浮点天数，与matplotlib.dates.date2num的结果相同（1970-01-01为0）
+        """
+        dates = pd.DatetimeIndex(date_index).values.astype("datetime64[ns]")
+        seconds = dates.astype("datetime64[s]")
+        # 不足一秒的部分单独加回，与date2num的算法一致
+        extra = (dates - seconds).astype(np.float64) / 1.0e9
+        return (
+            (seconds - np.datetime64("1970-01-01T00:00:00", "s")).astype(np.float64)
+            + extra
+        ) / 86400.0
+
+    @staticmethod
+    def _fit_srline(closing_price: Series, threshold: float) -> DataFrame:
+        """
+        对一个周期的收盘价拟合支撑线和阻力线，返回包含“支撑线”“阻力线”两列的DataFrame
+        """
+        # 日期只转换一次，拟合点的横坐标直接按位置取
+        closing_price_x = MySRLine._dates_to_num(closing_price.index)
+
+        # 对数据进行线性变换
+        transed_data, coeff = dfunc.shearing_and_recover(closing_price)
+        transed_values = np.asarray(transed_data.values)
+
+        # 拟合点数量
+        fit_points_num = int(len(transed_data) * threshold)
+        # 取transed_data的最大值和最小值所在的位置
+        positional_data = Series(transed_values)
+        max_points_pos = positional_data.nlargest(fit_points_num).index.to_numpy()
+        min_points_pos = positional_data.nsmallest(fit_points_num).index.to_numpy()
+
+        # 拟合阻力线
+        resistance_coeff = np.polyfit(
+            closing_price_x[max_points_pos], transed_values[max_points_pos], deg=1
+        )
+        # 根据resistance_coeff计算出拟合的阻力线的y值
+        resistance_y = np.polyval(resistance_coeff, closing_price_x)
+        # 根据y值和closing_price.index创建一个Series
+        resistance_line_data = Series(index=closing_price.index, data=resistance_y)
+
+        # 拟合支撑线
+        support_coeff = np.polyfit(
+            closing_price_x[min_points_pos], transed_values[min_points_pos], deg=1
+        )
+        # 根据support_coeff计算出拟合的支撑线的y值
+        support_y = np.polyval(support_coeff, closing_price_x)
+        # 根据y值和closing_price.index创建一个Series
+        support_line_data = Series(index=closing_price.index, data=support_y)
+
+        # 阻力线逆变换
+        original_resistance_line_data = dfunc.shearing_and_recover(
+            resistance_line_data, coeff=coeff
+        )
+        # 支撑线逆变换
+        original_support_line_data = dfunc.shearing_and_recover(
+            support_line_data, coeff=coeff
+        )
+
+        # # 画出拟合的直线和原数据，matplotlib只在画图时导入
+        # from matplotlib import pyplot as plt
+        #
+        # plt.plot(closing_price.index, closing_price, label="Smoothed Data")
+        # plt.plot(
+        #     original_resistance_line_data.index,
+        #     original_resistance_line_data,
+        #     label="Resistance Line",
+        # )
+        # plt.plot(
+        #     original_support_line_data.index,
+        #     original_support_line_data,
+        #     label="Support Line",
+        # )
+        # plt.legend()
+        # plt.show()
+
+        # 创建DataFrame
+        df_srline = DataFrame(index=closing_price.index, columns=["支撑线", "阻力线"])
+        df_srline["支撑线"] = original_support_line_data
+        df_srline["阻力线"] = original_resistance_line_data
+        df_srline.index.name = "日期"
+        return df_srline
+
+    @staticmethod
+    def _fit_srline_walk_forward(
+        closing_price: Series, threshold: float, window: int
+    ) -> DataFrame:
+        """
+        滚动拟合支撑线和阻力线，每根K线的值只由截至该K线的最近window根K线决定\n
+        横坐标为K线位置，直接在收盘价上拟合，不做剪切变换\n
+        前window-1根K线没有结果，为nan
+        """
+        support_y, resistance_y = SlidingSRLineFitter.fit(
+            closing_price.to_numpy(), window=window, threshold=threshold
+        )
+        df_srline = DataFrame(
+            {"支撑线": support_y, "阻力线": resistance_y}, index=closing_price.index
+        )
+        df_srline.index.name = "日期"
+        return df_srline
+
     def analyze(self) -> list[DataFrame]:
         dict_srline = super().get_dict()
         # 调用策略函数
@@ -150,14 +213,90 @@ class MySRLine(MyIndicator):
         # 返回策略结果
         return [srline_area_judge]
 
+    def sweep_parameters(
+        self,
+        thresholds: list[float],
+        area_nums: list[int],
+        periods: tuple[str, ...] = ("daily", "weekly"),
+        workers: int = 1,
+    ) -> tuple[DataFrame, DataFrame]:
+        """
+        对(threshold, area_num)的全部组合计算压力区策略的判断值，不读写指标文件和配置\n
+        每个threshold拟合一次支撑/阻力线、检测一次交叉，各area_num共用同一个met_line状态\n
+        workers大于1时，不同的threshold在多个进程中计算\n
+        返回(逐日结果, 汇总)：逐日结果每行为一个组合在一个周期一天的判断值，\n
+        汇总为每个组合的平均判断值、看多/看空天数占比，以及判断值与下一根K线收益率的秩相关系数（IC）
+        """
+        closing_price_dict = {
+            period: self.product_df_dict[period]["收盘"] for period in periods
+        }
+        if workers > 1 and len(thresholds) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                frames = list(
+                    executor.map(
+                        _sweep_one_threshold,
+                        [closing_price_dict] * len(thresholds),
+                        thresholds,
+                        [area_nums] * len(thresholds),
+                    )
+                )
+        else:
+            frames = [
+                _sweep_one_threshold(closing_price_dict, threshold, area_nums)
+                for threshold in thresholds
+            ]
+        df_results = pd.concat(frames, ignore_index=True)
+
+        # 下一根K线的收益率，与判断值按日期对齐
+        df_next_return = pd.concat(
+            [
+                DataFrame(
+                    {
+                        "period": period,
+                        "日期": closing_price.index,
+                        "next_return": closing_price.pct_change().shift(-1).to_numpy(),
+                    }
+                )
+                for period, closing_price in closing_price_dict.items()
+            ],
+            ignore_index=True,
+        )
+        df_merged = df_results.merge(df_next_return, on=["period", "日期"], how="left")
+        df_summary = DataFrame(
+            [
+                {
+                    "threshold": threshold,
+                    "area_num": area_num,
+                    "period": period,
+                    "mean_judge": group["judge"].mean(),
+                    "long_share": (group["judge"] > 0).mean(),
+                    "short_share": (group["judge"] < 0).mean(),
+                    "rank_ic": MySRLine._rank_ic(group["judge"], group["next_return"]),
+                }
+                for (threshold, area_num, period), group in df_merged.groupby(
+                    ["threshold", "area_num", "period"], sort=True
+                )
+            ]
+        )
+        return df_results, df_summary
+
+    @staticmethod
+    def _rank_ic(judge: Series, next_return: Series) -> float:
+        """判断值与下一期收益率的秩相关系数，先去掉缺失值再排名，不依赖scipy"""
+        valid = next_return.notna() & judge.notna()
+        return judge[valid].rank().corr(next_return[valid].rank())
+
     # 策略函数名请轻易不要修改！！！若修改，需要同时修改枚举类内的StrategyName！！！
     def _pressure_area_strategy(
         self,
         dict_srline: dict[str, DataFrame],
+        use_legacy_loop: bool = False,
     ) -> DataFrame:
         """
         压力区策略，将压力线和支撑线之间划分20个压力区\n
         由支撑线向上数第一个分区为第一区，以此类推\n
+        默认使用向量化计算，交叉情况由CrossDetector逐日检测\n
+        use_legacy_loop为True时使用逐日循环和DataFunctionalizer.check_cross()，用于核对结果
         """
 
         # 策略参数
@@ -169,74 +308,72 @@ class MySRLine(MyIndicator):
 
         area_num = strategy_config_value["area_num"]  # config
 
+        if not use_legacy_loop:
+            # 支撑/阻力线、策略参数和代码都没有变化时，直接使用结果图中上次的结果
+            df_cached_judge = super().load_strategy(
+                MySRLine._pressure_area_strategy.__name__, strategy_config_value
+            )
+            if df_cached_judge is not None:
+                return df_cached_judge
+
         # 创建一个空的DataFrame
         # 第一列为“日期”索引，第二列（daily）第三列（weekly）为-1至1的SRLine判断值
+        # 判断值初始化为0，直接使用float32，写入判断值时不再改变列的类型
         df_srline_judge = DataFrame(
-            index=dict_srline["daily"].index, columns=["daily", "weekly"]
+            0.0,
+            index=dict_srline["daily"].index,
+            columns=["daily", "weekly"],
+            dtype=JUDGE_DTYPE,
         )
 
-        # 初始化判断值为0
-        df_srline_judge["daily"] = 0
-        df_srline_judge["weekly"] = 0
-
         for period in ["daily", "weekly"]:
             # 取相应的支撑线和阻力线数据
             support_line = dict_srline[period]["支撑线"]
             resistance_line = dict_srline[period]["阻力线"]
-            # 计算每个压力区的宽度
-            area_width = (resistance_line - support_line) / area_num
             # 取相应的收盘价数据
             closing_price = self.product_df_dict[period]["收盘"]
 
-            # 用循环表示所有区域
-            pressue_area_index_list = []
-            for i in range(area_num):
-                lower_bound = support_line + area_width * i
-                upper_bound = support_line + area_width * (i + 1)
-                # 使用布尔索引获取位于当前区域的索引
-                area_indices = closing_price[
-                    (closing_price < upper_bound) & (closing_price >= lower_bound)
-                ].index
-                # 将当前区域的索引添加到列表中
-                pressue_area_index_list.append(area_indices)
-
-            # 获取股票数据收盘价格和支撑/阻力线数据的交叉情况
-            # 和阻力线交叉
-            resistance_cross = dfunc.check_cross(resistance_line, closing_price)
-            # 和支撑线交叉
-            support_cross = dfunc.check_cross(support_line, closing_price)
-
-            met_line = "undefined"
-            step = float(1 / area_num * 2)
-            # 根据日期遍历dataframe
-            for date in closing_price.index:
-                # 当日期属于支撑线交叉点时
-                if date in support_cross.values:
-                    met_line = "support"
-                # 当日期属于阻力线交叉点时
-                if date in resistance_cross.values:
-                    met_line = "resistance"
-
-                if met_line == "support":
-                    # 在第一区时或支撑线下方，判断为1
-                    if support_line[date] >= closing_price[date]:
-                        df_srline_judge.loc[date, period] = 1
-                        continue
-                    # 若在支撑线下方之后每上升一个压力区，判断值减0.5
-                    # 判断其压力区
-                    for i in range(area_num):
-                        if date in pressue_area_index_list[i]:
-                            if i >= area_num // 2:
-                                expect = 1 - (i + 1) * step
-                            else:
-                                expect = 1 - i * step
-
-                            # print(expect)
-                            df_srline_judge.loc[date, period] = round(expect, 1)
-                            break
-
-                if met_line == "resistance":
-                    df_srline_judge.loc[date, period] = -1.0
+            if use_legacy_loop:
+                # 获取股票数据收盘价格和支撑/阻力线数据的交叉情况
+                # 和阻力线交叉
+                resistance_cross = dfunc.check_cross(resistance_line, closing_price)
+                # 和支撑线交叉
+                support_cross = dfunc.check_cross(support_line, closing_price)
+                self._pressure_area_loop(
+                    df_srline_judge=df_srline_judge,
+                    period=period,
+                    support_line=support_line,
+                    resistance_line=resistance_line,
+                    closing_price=closing_price,
+                    support_cross=support_cross,
+                    resistance_cross=resistance_cross,
+                    area_num=area_num,
+                )
+                continue
+
+            # 对齐到收盘价的日期，交叉情况为逐日的掩码
+            support_values = support_line.reindex(closing_price.index).to_numpy(
+                dtype=float
+            )
+            resistance_values = resistance_line.reindex(closing_price.index).to_numpy(
+                dtype=float
+            )
+            judge = MySRLine._pressure_area_judge(
+                closing_price=closing_price.to_numpy(dtype=float),
+                support_line=support_values,
+                resistance_line=resistance_values,
+                support_event=CrossDetector.cross_mask(support_line, closing_price),
+                resistance_event=CrossDetector.cross_mask(
+                    resistance_line, closing_price
+                ),
+                area_num=area_num,
+            )
+            # 一次性写入整列，未出现在该周期中的日期保持为0
+            df_srline_judge[period] = (
+                Series(data=judge, index=closing_price.index)
+                .reindex(df_srline_judge.index, fill_value=0.0)
+                .astype(JUDGE_DTYPE)
+            )
 
         # 保存策略结果
         super().save_strategy(
@@ -246,6 +383,187 @@ class MySRLine(MyIndicator):
         )
         return df_srline_judge
 
+    @staticmethod
+    def _pressure_area_judge(
+        closing_price: np.ndarray,
+        support_line: np.ndarray,
+        resistance_line: np.ndarray,
+        support_event: np.ndarray,
+        resistance_event: np.ndarray,
+        area_num: int,
+    ) -> np.ndarray:
+        """
+        压力区策略的向量化计算，返回与收盘价等长的判断值数组\n
+        交叉事件相同时，结果与_pressure_area_loop()逐日循环的结果一致
+        """
+        met_line = MySRLine._met_line_state(support_event, resistance_event)
+        return MySRLine._area_judge_from_state(
+            closing_price=closing_price,
+            support_line=support_line,
+            resistance_line=resistance_line,
+            met_line=met_line,
+            area_num=area_num,
+        )
+
+    @staticmethod
+    def _met_line_state(
+        support_event: np.ndarray, resistance_event: np.ndarray
+    ) -> np.ndarray:
+        """
+        由交叉事件得到每天的met_line状态：0为undefined，1为support，2为resistance\n
+        与area_num无关，参数扫描时同一组支撑/阻力线只需计算一次\n
+        同一天同时与两线交叉时，阻力线优先（与循环中的判断顺序一致）
+        """
+        return met_line_state(
+            np.asarray(support_event, dtype=bool),
+            np.asarray(resistance_event, dtype=bool),
+            0,
+        )
+
+    @staticmethod
+    def _area_judge_from_state(
+        closing_price: np.ndarray,
+        support_line: np.ndarray,
+        resistance_line: np.ndarray,
+        met_line: np.ndarray,
+        area_num: int,
+    ) -> np.ndarray:
+        """由met_line状态和压力区划分计算判断值，支撑/阻力线缺失的日期（如滚动拟合的预热期）判断值为0"""
+        n = closing_price.shape[0]
+
+        # 计算每个压力区的宽度
+        area_width = (resistance_line - support_line) / area_num
+        # 按循环版本的算式计算各区边界，保证边界上的归属相同
+        bounds = support_line[:, None] + area_width[:, None] * np.arange(area_num + 1)
+        # 位于支撑线和阻力线之间（宽度非正时不属于任何压力区）
+        in_area = (closing_price >= bounds[:, 0]) & (closing_price < bounds[:, -1])
+        # 所在压力区的序号
+        area_index = (closing_price[:, None] >= bounds[:, :-1]).sum(axis=1) - 1
+
+        # 每个压力区对应的判断值
+        step = float(1 / area_num * 2)
+        area_expect = np.array(
+            [
+                (
+                    round(1 - (i + 1) * step, 1)
+                    if i >= area_num // 2
+                    else round(1 - i * step, 1)
+                )
+                for i in range(area_num)
+            ]
+        )
+
+        judge = np.zeros(n)
+        on_support = met_line == 1
+        # 若在支撑线上方，每上升一个压力区，判断值相应减小
+        judge[on_support & in_area] = area_expect[area_index[on_support & in_area]]
+        # 在支撑线下方（含支撑线），判断为1
+        judge[on_support & (support_line >= closing_price)] = 1.0
+        # 遇到阻力线，判断为-1
+        judge[met_line == 2] = -1.0
+        # 没有支撑/阻力线时不做判断
+        judge[np.isnan(support_line) | np.isnan(resistance_line)] = 0.0
+
+        return judge
+
+    def _pressure_area_loop(
+        self,
+        df_srline_judge: DataFrame,
+        period: str,
+        support_line: Series,
+        resistance_line: Series,
+        closing_price: Series,
+        support_cross: Series,
+        resistance_cross: Series,
+        area_num: int,
+    ) -> None:
+        """
+        压力区策略的逐日循环版本，直接写入df_srline_judge的period列\n
+        仅用于核对_pressure_area_judge()的结果
+        """
+        # 计算每个压力区的宽度
+        area_width = (resistance_line - support_line) / area_num
+
+        # 用循环表示所有区域
+        pressue_area_index_list = []
+        for i in range(area_num):
+            lower_bound = support_line + area_width * i
+            upper_bound = support_line + area_width * (i + 1)
+            # 使用布尔索引获取位于当前区域的索引
+            area_indices = closing_price[
+                (closing_price < upper_bound) & (closing_price >= lower_bound)
+            ].index
+            # 将当前区域的索引添加到列表中
+            pressue_area_index_list.append(area_indices)
+
+        met_line = "undefined"
+        step = float(1 / area_num * 2)
+        # 根据日期遍历dataframe
+        for date in closing_price.index:
+            # 当日期属于支撑线交叉点时
+            if date in support_cross.values:
+                met_line = "support"
+            # 当日期属于阻力线交叉点时
+            if date in resistance_cross.values:
+                met_line = "resistance"
+
+            if met_line == "support":
+                # 在第一区时或支撑线下方，判断为1
+                if support_line[date] >= closing_price[date]:
+                    df_srline_judge.loc[date, period] = 1
+                    continue
+                # 若在支撑线下方之后每上升一个压力区，判断值减0.5
+                # 判断其压力区
+                for i in range(area_num):
+                    if date in pressue_area_index_list[i]:
+                        if i >= area_num // 2:
+                            expect = 1 - (i + 1) * step
+                        else:
+                            expect = 1 - i * step
+
+                        # print(expect)
+                        df_srline_judge.loc[date, period] = round(expect, 1)
+                        break
+
+            if met_line == "resistance":
+                df_srline_judge.loc[date, period] = -1.0
+
+
+def _sweep_one_threshold(
+    closing_price_dict: dict[str, Series], threshold: float, area_nums: list[int]
+) -> DataFrame:
+    """参数扫描中一个threshold的全部计算，定义在模块层以便在子进程中执行"""
+    frames = []
+    for period, closing_price in closing_price_dict.items():
+        df_srline = MySRLine._fit_srline(closing_price, threshold)
+        support_line = df_srline["支撑线"].to_numpy(dtype=float)
+        resistance_line = df_srline["阻力线"].to_numpy(dtype=float)
+        met_line = MySRLine._met_line_state(
+            support_event=CrossDetector.cross_mask(df_srline["支撑线"], closing_price),
+            resistance_event=CrossDetector.cross_mask(
+                df_srline["阻力线"], closing_price
+            ),
+        )
+        for area_num in area_nums:
+            frames.append(
+                DataFrame(
+                    {
+                        "threshold": threshold,
+                        "area_num": area_num,
+                        "period": period,
+                        "日期": closing_price.index,
+                        "judge": MySRLine._area_judge_from_state(
+                            closing_price=closing_price.to_numpy(dtype=float),
+                            support_line=support_line,
+                            resistance_line=resistance_line,
+                            met_line=met_line,
+                            area_num=area_num,
+                        ).astype(JUDGE_DTYPE),
+                    }
+                )
+            )
+    return pd.concat(frames, ignore_index=True)
+
 
 if __name__ == "__main__":
     # 调用函数
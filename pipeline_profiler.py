@@ -0,0 +1,150 @@
+"""pipeline_profiler.py 分析流程的耗时记录，按产品、按阶段记录耗时和数据行数"""
+
+from contextlib import contextmanager
+from pandas import DataFrame
+from config import do_logging
+from typing import Callable, Iterator, Optional
+
+import cProfile
+import datetime as dt
+import functools
+import json
+import os
+import time
+
+logger = do_logging()
+
+# 设置该环境变量后，每个产品的分析过程会输出一个cProfile文件到该文件夹
+PROFILE_DIR_ENV = "GOINVEST_PROFILE_DIR"
+
+
+def _count_rows(result: object) -> Optional[int]:
+    """统计返回值中的数据行数，支持DataFrame、DataFrame字典和DataFrame列表"""
+    if isinstance(result, DataFrame):
+        return len(result)
+    if isinstance(result, dict):
+        frames = [df for df in result.values() if isinstance(df, DataFrame)]
+    elif isinstance(result, list):
+        frames = [df for df in result if isinstance(df, DataFrame)]
+    else:
+        return None
+    return sum(len(df) for df in frames) if frames else None
+
+
+class PipelineProfiler:
+    """
+    记录分析流程中每个阶段的耗时，记录同时输出到do_logging的日志\n
+    可用export_trace()导出为json或csv
+    """
+
+    def __init__(self) -> None:
+        self.records: list[dict] = []
+
+    @contextmanager
+    def span(
+        self, stage: str, product_code: str, indicator: str = ""
+    ) -> Iterator[dict]:
+        """记录一个阶段的耗时，可以在with语句内设置record["rows"]"""
+        record = {
+            "product_code": product_code,
+            "indicator": indicator,
+            "stage": stage,
+            "start": dt.datetime.now().isoformat(timespec="milliseconds"),
+            "seconds": None,
+            "rows": None,
+        }
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start_time, 6)
+            self.records.append(record)
+            message = (
+                f"{product_code}{indicator}阶段'{stage}'耗时{record['seconds']:.3f}秒"
+            )
+            if record["rows"] is not None:
+                message += f"，{record['rows']}行"
+            logger.debug(message)
+
+    def timed(self, stage: str) -> Callable:
+        """方法装饰器，产品代码取自self.product_code或self.stock_code，行数取自返回值"""
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(obj, *args, **kwargs):
+                product_code = getattr(
+                    obj, "product_code", getattr(obj, "stock_code", "")
+                )
+                indicator_name = getattr(obj, "indicator_name", None)
+                with self.span(
+                    stage,
+                    product_code,
+                    indicator_name.value if indicator_name is not None else "",
+                ) as record:
+                    result = func(obj, *args, **kwargs)
+                    record["rows"] = _count_rows(result)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def profile_symbol(self, product_code: str) -> Iterator[None]:
+        """设置了GOINVEST_PROFILE_DIR时，用cProfile记录该产品的分析过程"""
+        profile_dir = os.environ.get(PROFILE_DIR_ENV)
+        if not profile_dir:
+            yield
+            return
+
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profile_path = os.path.join(profile_dir, f"{product_code}.prof")
+            profiler.dump_stats(profile_path)
+            logger.debug(f"查看{product_code}的cProfile结果\n>>>>{profile_path}")
+
+    def drain(self) -> list[dict]:
+        """取出并清空已有的记录，用于把子进程中的记录交给主进程"""
+        records = self.records
+        self.records = []
+        return records
+
+    def summary(self) -> DataFrame:
+        """按阶段汇总的总耗时、平均耗时和次数"""
+        if not self.records:
+            return DataFrame(columns=["total_seconds", "mean_seconds", "count"])
+        return (
+            DataFrame(self.records)
+            .groupby(["stage", "indicator"])["seconds"]
+            .agg(total_seconds="sum", mean_seconds="mean", count="count")
+            .sort_values("total_seconds", ascending=False)
+        )
+
+    def export_trace(self, path: str) -> None:
+        """导出全部记录，后缀为.csv时输出csv，否则输出json"""
+        if path.endswith(".csv"):
+            with open(path, "w", encoding="utf-8") as f:
+                DataFrame(
+                    self.records,
+                    columns=[
+                        "product_code",
+                        "indicator",
+                        "stage",
+                        "start",
+                        "seconds",
+                        "rows",
+                    ],
+                ).to_csv(f, index=False)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.records, f, indent=4, ensure_ascii=False)
+        logger.info(f"查看耗时记录\n>>>>{path}")
+
+
+# 进程内共享的耗时记录
+pipeline_profiler = PipelineProfiler()
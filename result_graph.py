@@ -0,0 +1,228 @@
+"""result_graph.py 以内容为键的指标、策略结果缓存：K线 -> 指标 -> 策略，任一环节变化时其下游自动失效"""
+
+from pandas import DataFrame
+from utils.config_service import file_lock
+from utils.data_cache import data_cache
+from utils.data_storage import get_storage, WriteBatch
+from config import do_logging
+from typing import Optional
+
+import datetime as dt
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+logger = do_logging()
+
+
+def _digest(payload: object) -> str:
+    return hashlib.blake2b(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode(
+            "utf-8"
+        ),
+        digest_size=16,
+    ).hexdigest()
+
+
+def fingerprint_df_dict(df_dict: dict[str, DataFrame]) -> str:
+    """K线字典的内容指纹，日期、列名、数据类型和数值任一变化时指纹都会变化"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for period in sorted(df_dict.keys()):
+        df = df_dict[period]
+        hasher.update(period.encode("utf-8"))
+        hasher.update(
+            json.dumps(
+                [[str(col), str(df[col].dtype)] for col in df.columns],
+                ensure_ascii=False,
+            ).encode("utf-8")
+        )
+        hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def _source_files(cls: type) -> list[str]:
+    """
+    类的结果所依赖的源码文件：类及其各基类所在的模块，\n
+    以及各类在_code_dependencies中声明的模块（如交叉检测、拟合内核等）
+    """
+    modules = []
+    for klass in cls.__mro__:
+        if klass.__module__ in ("builtins", "abc"):
+            continue
+        modules.append(sys.modules.get(klass.__module__, klass))
+        for module_name in klass.__dict__.get("_code_dependencies", ()):
+            try:
+                modules.append(importlib.import_module(module_name))
+            except ImportError:
+                logger.debug(f"{cls.__qualname__}依赖的模块{module_name}无法导入")
+    files = set()
+    for module in modules:
+        try:
+            files.add(inspect.getfile(module))
+        except TypeError:
+            continue
+    return sorted(files)
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(cls: type) -> str:
+    """类的结果所依赖的全部源码的指纹，修改其中任一模块后，旧的结果不再命中"""
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        for path in _source_files(cls):
+            hasher.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as f:
+                hasher.update(f.read())
+    except OSError:
+        # 无法取得源码时（如交互式环境中定义的类）以类名代替
+        return cls.__qualname__
+    return hasher.hexdigest()
+
+
+class ResultGraph:
+    """
+    每个产品的结果保存在data_path下的result_graph文件夹中，manifest.json记录每个结果节点：\n
+    节点的键 = hash(上游节点的键, 类型, 名称, 参数, 代码版本)，K线节点的键为K线的内容指纹\n
+    因此参数、代码或K线变化时键随之变化，只有受影响的节点需要重新计算，未变化的节点直接读取\n
+    每个(类型, 名称)最多保留max_versions个版本，参数来回切换时不必重复计算
+    """
+
+    def __init__(self, store_format: str = "npy", max_versions: int = 3) -> None:
+        self.store_format = store_format
+        self.max_versions = max_versions
+
+    @staticmethod
+    def node_key(
+        parent_key: str, kind: str, name: str, params: Optional[dict], version: str
+    ) -> str:
+        """计算结果节点的键"""
+        return _digest([parent_key, kind, name, params, version])
+
+    @staticmethod
+    def _graph_path(data_path: str) -> str:
+        return f"{data_path}\\result_graph"
+
+    def _manifest_path(self, data_path: str) -> str:
+        return f"{self._graph_path(data_path)}\\manifest.json"
+
+    def _frame_stem(self, data_path: str, key: str, part: str) -> str:
+        return f"{self._graph_path(data_path)}\\{key}_{part}"
+
+    def nodes(self, data_path: str) -> dict[str, dict]:
+        """读取manifest.json中的全部节点"""
+        manifest_path = self._manifest_path(data_path)
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self, data_path: str, key: str) -> Optional[dict[str, DataFrame]]:
+        """
+        读取节点的结果，先查进程内缓存，未记录或文件缺失时返回None\n
+        返回的是副本，可以修改，不会影响缓存和内存映射的文件
+        """
+        df_dict = data_cache.get(("result", data_path, key))
+        if df_dict is not None:
+            return {part: df.copy() for part, df in df_dict.items()}
+
+        node = self.nodes(data_path).get(key)
+        if node is None:
+            return None
+        storage = get_storage(node["format"])
+        try:
+            df_dict = {
+                part: storage.read(self._frame_stem(data_path, key, part))
+                for part in node["parts"]
+            }
+        except (OSError, ValueError) as e:
+            logger.debug(f"结果节点{key}的文件不完整，需要重新计算\n>>>>{e}")
+            return None
+        data_cache.put(("result", data_path, key), df_dict)
+        return {part: df.copy() for part, df in df_dict.items()}
+
+    def store(
+        self,
+        data_path: str,
+        key: str,
+        kind: str,
+        name: str,
+        parent_key: str,
+        params: Optional[dict],
+        df_dict: dict[str, DataFrame],
+        write_batch: Optional[WriteBatch] = None,
+    ) -> None:
+        """
+        保存节点的结果并登记到manifest.json，同名节点超过max_versions个时删除最旧的\n
+        传入write_batch时，文件和manifest.json在write_batch.flush()时才写出，进程内缓存立即可用
+        """
+        os.makedirs(self._graph_path(data_path), exist_ok=True)
+        data_cache.put(("result", data_path, key), df_dict)
+        node = {
+            "kind": kind,
+            "name": name,
+            "parent": parent_key,
+            "params": params,
+            "parts": list(df_dict.keys()),
+            "format": self.store_format,
+            "created": dt.datetime.now().isoformat(timespec="microseconds"),
+        }
+        if write_batch is not None:
+            for part, df in df_dict.items():
+                write_batch.add(
+                    self.store_format, df, self._frame_stem(data_path, key, part)
+                )
+            # 文件写出之后再登记节点
+            write_batch.after_flush(
+                functools.partial(self._register, data_path, key, node)
+            )
+            return
+
+        storage = get_storage(self.store_format)
+        for part, df in df_dict.items():
+            storage.write(df, self._frame_stem(data_path, key, part))
+        self._register(data_path, key, node)
+
+    def _register(self, data_path: str, key: str, node: dict) -> None:
+        """将节点登记到manifest.json，并删除超出max_versions的旧节点"""
+        kind, name = node["kind"], node["name"]
+        with file_lock(f"{self._manifest_path(data_path)}.lock"):
+            nodes = self.nodes(data_path)
+            nodes[key] = node
+            same_name_keys = sorted(
+                (
+                    node_key
+                    for node_key, node in nodes.items()
+                    if node["kind"] == kind and node["name"] == name
+                ),
+                key=lambda node_key: nodes[node_key]["created"],
+            )
+            for old_key in same_name_keys[: -self.max_versions]:
+                if old_key == key:
+                    continue
+                self._remove_files(data_path, old_key, nodes.pop(old_key))
+
+            tmp_path = f"{self._manifest_path(data_path)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(nodes, f, indent=4, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self._manifest_path(data_path))
+
+    def _remove_files(self, data_path: str, key: str, node: dict) -> None:
+        storage = get_storage(node["format"])
+        for part in node["parts"]:
+            path = storage.path_of(self._frame_stem(data_path, key, part))
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        logger.debug(f"删除旧的结果节点{node['kind']}:{node['name']}\n>>>>{key}")
+
+
+# 进程内共享的结果图
+result_graph = ResultGraph()
@@ -0,0 +1,179 @@
+"""screener.py 全市场横截面筛选：各产品最新的指标值和判断值汇总为一张面板，按列向量化筛选"""
+
+from pandas import DataFrame
+from utils.config_service import file_lock
+from utils.data_storage import get_storage
+from config import __BASE_PATH__, do_logging
+from typing import Iterable, Optional
+
+import atexit
+import datetime as dt
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = do_logging()
+
+# 筛选条件支持的比较方式
+SCREEN_OPERATORS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+
+def indicator_column(indicator_name: str, period: str, column: str) -> str:
+    """面板中指标值的列名，例如SRLine_daily_支撑线"""
+    return f"{indicator_name}_{period}_{column}"
+
+
+def exact_judge_value(value, dtype) -> float:
+    """
+    判断值转为float，float32的判断值取其最短的十进制表示，\n
+    避免0.6转为float64后变成0.6000000238，无法用==筛选，且不损失0.25等更细的判断值
+    """
+    if dtype == np.float32:
+        return float(str(np.float32(value)))
+    return float(value)
+
+
+def strategy_column(indicator_name: str, func_name: str, period: str) -> str:
+    """面板中判断值的列名，例如SRLine_pressure_area_strategy_daily"""
+    return f"{indicator_name}{func_name}_{period}"
+
+
+class PanelRecorder:
+    """
+    进程内记录每个产品最新一根K线的指标值和判断值，由save_indicator()、save_strategy()写入\n
+    flush()时加文件锁，与磁盘上的面板合并后保存，多个进程各自记录、各自合并，互不覆盖
+    """
+
+    def __init__(self, panel_stem: Optional[str] = None) -> None:
+        self.panel_stem = panel_stem or f"{__BASE_PATH__}\\data\\screener_panel"
+        # {产品代码: {列名: 值}}
+        self._rows: dict[str, dict[str, float]] = {}
+        self._lock = threading.RLock()
+        atexit.register(self.flush)
+
+    def record_indicator(
+        self, product_code: str, indicator_name: str, df_dict: dict[str, DataFrame]
+    ) -> None:
+        with self._lock:
+            row = self._rows.setdefault(product_code, {})
+            for period, df in df_dict.items():
+                if df.empty:
+                    continue
+                for column, value in df.iloc[-1].items():
+                    row[indicator_column(indicator_name, period, str(column))] = value
+
+    def record_strategy(
+        self,
+        product_code: str,
+        indicator_name: str,
+        func_name: str,
+        df_judge: DataFrame,
+    ) -> None:
+        if df_judge.empty:
+            return
+        with self._lock:
+            row = self._rows.setdefault(product_code, {})
+            for period, value in df_judge.iloc[-1].items():
+                row[strategy_column(indicator_name, func_name, str(period))] = (
+                    exact_judge_value(value, df_judge.dtypes[period])
+                )
+
+    def flush(self) -> None:
+        """将记录合并到面板文件，同一产品的同一列以本次记录为准"""
+        with self._lock:
+            if not self._rows:
+                return
+            df_new = DataFrame.from_dict(self._rows, orient="index").apply(
+                pd.to_numeric, errors="coerce"
+            )
+            df_new["更新日期"] = dt.date.today().isoformat()
+
+            storage = get_storage("npy")
+            os.makedirs(os.path.dirname(self.panel_stem) or ".", exist_ok=True)
+            with file_lock(f"{self.panel_stem}.lock"):
+                if storage.exists(self.panel_stem):
+                    df_panel = df_new.combine_first(storage.read(self.panel_stem))
+                else:
+                    df_panel = df_new
+                df_panel.index.name = "产品代码"
+                storage.write(df_panel.sort_index(), self.panel_stem)
+
+            logger.debug(
+                f"更新{len(self._rows)}个产品的筛选面板\n>>>>{self.panel_stem}"
+            )
+            self._rows.clear()
+
+
+class Screener:
+    """
+    在面板上筛选产品，面板以产品代码为索引，每列为一个指标值或判断值\n
+    面板以内存映射方式读取，筛选只做列上的向量比较
+    """
+
+    def __init__(
+        self,
+        panel: Optional[DataFrame] = None,
+        panel_stem: Optional[str] = None,
+        product_codes: Optional[Iterable[str]] = None,
+    ) -> None:
+        if panel is None:
+            panel_stem = panel_stem or f"{__BASE_PATH__}\\data\\screener_panel"
+            panel = get_storage("npy").read(panel_stem)
+        if product_codes is not None:
+            # 只保留名单中的产品，例如请求名单中的identityCode
+            panel = panel.reindex(list(product_codes))
+        self.panel = panel
+
+    def mask(self, column: str, operator: str, value) -> np.ndarray:
+        """
+        单个条件的布尔掩码，operator为比较符号或"in"，缺失值不满足任何条件\n
+        浮点列的"=="、"!="和"in"按np.isclose()比较，不受float32转换误差的影响
+        """
+        if column not in self.panel.columns:
+            raise KeyError(
+                f"筛选面板中没有'{column}'列，可选：{list(self.panel.columns)}"
+            )
+        values = self.panel[column].to_numpy()
+        is_float = np.issubdtype(values.dtype, np.floating)
+        if operator == "in":
+            if is_float:
+                return np.isclose(
+                    values[:, None], np.asarray(list(value), dtype=float)
+                ).any(axis=1)
+            return np.isin(values, list(value))
+        if is_float and operator in ("==", "!="):
+            close = np.isclose(values, value)
+            return close if operator == "==" else ~close & ~np.isnan(values)
+        if operator not in SCREEN_OPERATORS:
+            raise ValueError(
+                f"不支持的比较方式'{operator}'，可选：{list(SCREEN_OPERATORS.keys()) + ['in']}"
+            )
+        with np.errstate(invalid="ignore"):
+            return SCREEN_OPERATORS[operator](values, value)
+
+    def select(self, *conditions: tuple[str, str, object]) -> DataFrame:
+        """
+        返回同时满足全部条件的产品，每个条件为(列名, 比较方式, 值)，例如\n
+        select(("SRLine_pressure_area_strategy_daily", "==", 1), ("RSI_daily_14", "<", 30))
+        """
+        mask = np.ones(len(self.panel), dtype=bool)
+        for column, operator, value in conditions:
+            mask &= self.mask(column, operator, value)
+        return self.panel[mask]
+
+    def query(self, expr: str) -> DataFrame:
+        """DataFrame.query()形式的筛选，中文列名需要用反引号括起来"""
+        return self.panel.query(expr)
+
+
+# 进程内共享的面板记录器
+panel_recorder = PanelRecorder()
@@ -0,0 +1,187 @@
+"""sliding_srline.py 滚动窗口的支撑/阻力线拟合，窗口滑动时增量更新极值点和最小二乘的求和项"""
+
+from collections import deque
+
+import bisect
+
+import numpy as np
+
+
+class _LineSums:
+    """
+    一组点的最小二乘直线所需的求和项\n
+    横坐标为整数位置，Sx、Sxx用整数精确累加，Sy、Sxy为浮点数
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.sx = 0
+        self.sxx = 0
+        self.sy = 0.0
+        self.sxy = 0.0
+
+    def add(self, x: int, y: float) -> None:
+        self.n += 1
+        self.sx += x
+        self.sxx += x * x
+        self.sy += y
+        self.sxy += x * y
+
+    def remove(self, x: int, y: float) -> None:
+        self.n -= 1
+        self.sx -= x
+        self.sxx -= x * x
+        self.sy -= y
+        self.sxy -= x * y
+
+    def value_at(self, x: int) -> float:
+        """拟合直线在x处的值，点数不足或横坐标全部相同时为nan"""
+        denominator = self.n * self.sxx - self.sx * self.sx
+        if self.n < 2 or denominator == 0:
+            return np.nan
+        slope = (self.n * self.sxy - self.sx * self.sy) / denominator
+        intercept = (self.sy - slope * self.sx) / self.n
+        return intercept + slope * x
+
+
+class SlidingSRLineFitter:
+    """
+    滚动窗口内的支撑/阻力线\n
+    窗口内收盘价最高的k个点拟合阻力线，最低的k个点拟合支撑线，k=int(window*threshold)，至少为2\n
+    横坐标为K线的位置，每根K线的值为截至该K线的窗口拟合出的直线在该K线处的值\n
+    窗口滑动时只更新移出、移入的点：有序列表定位极值点集合的边界，求和项增减，每根K线不再重新拟合\n
+    对象保存了窗口状态，可以分段多次调用update()，结果与一次性计算相同
+    """
+
+    def __init__(self, window: int, threshold: float) -> None:
+        if window < 2:
+            raise ValueError(f"窗口长度至少为2，当前为{window}！")
+        self.window = window
+        self.k = min(window, max(2, int(window * threshold)))
+        # 窗口内的点按(价格, 位置)排序，相同价格按位置区分
+        self._sorted: list[tuple[float, int]] = []
+        # 窗口内的点按时间排序
+        self._queue: deque[tuple[float, int]] = deque()
+        self._top = _LineSums()
+        self._bottom = _LineSums()
+        # 下一根K线的位置
+        self._pos = 0
+        # 求和项的横坐标以_base为原点，定期重算时移动原点，避免数值过大
+        self._base = 0
+        self._steps_since_resync = 0
+
+    def _x(self, pos: int) -> int:
+        return pos - self._base
+
+    def _add_top(self, point: tuple[float, int]) -> None:
+        self._top.add(self._x(point[1]), point[0])
+
+    def _remove_top(self, point: tuple[float, int]) -> None:
+        self._top.remove(self._x(point[1]), point[0])
+
+    def _add_bottom(self, point: tuple[float, int]) -> None:
+        self._bottom.add(self._x(point[1]), point[0])
+
+    def _remove_bottom(self, point: tuple[float, int]) -> None:
+        self._bottom.remove(self._x(point[1]), point[0])
+
+    def _pop_oldest(self) -> None:
+        """移出窗口内最早的点，两个极值点集合由相邻的点补位"""
+        point = self._queue.popleft()
+        size = len(self._sorted)
+        rank = bisect.bisect_left(self._sorted, point)
+        if rank >= size - self.k:
+            self._remove_top(point)
+            if size - 1 - self.k >= 0:
+                self._add_top(self._sorted[size - 1 - self.k])
+        if rank < self.k:
+            self._remove_bottom(point)
+            if self.k < size:
+                self._add_bottom(self._sorted[self.k])
+        del self._sorted[rank]
+
+    def _push(self, point: tuple[float, int]) -> None:
+        """移入一个新的点，挤出极值点集合边界上的点"""
+        size = len(self._sorted)
+        rank = bisect.bisect_left(self._sorted, point)
+        if size < self.k:
+            self._add_top(point)
+            self._add_bottom(point)
+        else:
+            if rank > size - self.k:
+                self._add_top(point)
+                self._remove_top(self._sorted[size - self.k])
+            if rank < self.k:
+                self._add_bottom(point)
+                self._remove_bottom(self._sorted[self.k - 1])
+        self._sorted.insert(rank, point)
+        self._queue.append(point)
+
+    def _resync(self) -> None:
+        """以当前窗口的起点为原点重算求和项，消除浮点累加误差"""
+        self._base = self._queue[0][1] if self._queue else self._pos
+        self._top.reset()
+        self._bottom.reset()
+        for point in self._sorted[-self.k :]:
+            self._add_top(point)
+        for point in self._sorted[: self.k]:
+            self._add_bottom(point)
+        self._steps_since_resync = 0
+
+    def update(self, closing_price: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        依次输入新的收盘价，返回每根K线对应的(支撑线, 阻力线)\n
+        窗口未满的K线结果为nan，收盘价为nan的K线不进入窗口，结果也为nan
+        """
+        values = np.asarray(closing_price, dtype=np.float64)
+        support = np.full(len(values), np.nan)
+        resistance = np.full(len(values), np.nan)
+
+        for i, value in enumerate(values.tolist()):
+            pos = self._pos
+            self._pos += 1
+            if value != value:
+                continue
+            if len(self._queue) == self.window:
+                self._pop_oldest()
+            self._push((value, pos))
+
+            self._steps_since_resync += 1
+            if self._steps_since_resync >= self.window:
+                self._resync()
+
+            if len(self._queue) == self.window:
+                x = self._x(pos)
+                support[i] = self._bottom.value_at(x)
+                resistance[i] = self._top.value_at(x)
+
+        return support, resistance
+
+    @staticmethod
+    def fit(
+        closing_price: np.ndarray, window: int, threshold: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """一次性计算整段收盘价的滚动支撑/阻力线"""
+        return SlidingSRLineFitter(window, threshold).update(closing_price)
+
+
+def naive_sliding_srline(
+    closing_price: np.ndarray, window: int, threshold: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """逐根K线用np.polyfit重新拟合，O(n·window)，仅用于核对SlidingSRLineFitter的结果"""
+    values = np.asarray(closing_price, dtype=np.float64)
+    k = min(window, max(2, int(window * threshold)))
+    support = np.full(len(values), np.nan)
+    resistance = np.full(len(values), np.nan)
+    valid_pos = np.flatnonzero(~np.isnan(values))
+    for j in range(window - 1, len(valid_pos)):
+        pos = valid_pos[j - window + 1 : j + 1]
+        # 与有序列表相同的排序方式：先按价格，再按位置
+        order = np.lexsort((pos, values[pos]))
+        for line, chosen in ((support, order[:k]), (resistance, order[-k:])):
+            coeff = np.polyfit(pos[chosen], values[pos][chosen], deg=1)
+            line[valid_pos[j]] = np.polyval(coeff, valid_pos[j])
+    return support, resistance
@@ -1,8 +1,8 @@
 import datetime as dt
 
 
-from utils import dataSource_picker as dsp
-from utils import data_analyst as da
+from utils.data_cache import data_cache
+from utils.pipeline_profiler import pipeline_profiler
 from pandas import Series
 from utils.enumeration_label import ProductType
 from utils.enumeration_label import IndicatorName
@@ -21,7 +21,7 @@ class Stock:
     # 获取指定产品的日K/周K
     def obtain_kline(self) -> None:
         # 获取数据
-        dsp.dataPicker.product_source_picker(
+        data_cache.product_df_dict(
             self.stock_code,
             today_date=self.today_date,
             product_type=ProductType.Stock,
@@ -29,53 +29,38 @@ class Stock:
 
     # 分析指定产品的日K/周K，生成分析报告
     def analyze_stock(self) -> None:
-        # 调用分析函数
-        da.StockAnalyst(
-            stock_code=self.stock_code,
-            today_date=self.today_date,
-        ).analyze()
+        # 分析模块会导入全部指标，只在需要分析时导入
+        from utils import data_analyst as da
+
+        # 调用分析函数，记录耗时
+        with pipeline_profiler.profile_symbol(self.stock_code), pipeline_profiler.span(
+            "analyze_stock", self.stock_code
+        ):
+            da.StockAnalyst(
+                stock_code=self.stock_code,
+                today_date=self.today_date,
+            ).analyze()
 
     def get_sma(self) -> dict[str, DataFrame]:
-        return dsp.dataPicker.indicator_source_picker(
-            product_code=self.stock_code,
-            today_date=self.today_date,
-            product_type=ProductType.Stock,
-            indicator_name=IndicatorName.SMA,
-            product_df_dict=None,
-        )
+        return self._get_indicator(IndicatorName.SMA)
 
     def get_ema(self) -> dict[str, DataFrame]:
-        return dsp.dataPicker.indicator_source_picker(
-            product_code=self.stock_code,
-            today_date=self.today_date,
-            product_type=ProductType.Stock,
-            indicator_name=IndicatorName.EMA,
-            product_df_dict=None,
-        )
+        return self._get_indicator(IndicatorName.EMA)
 
     def get_boll(self) -> dict[str, DataFrame]:
-        return dsp.dataPicker.indicator_source_picker(
-            product_code=self.stock_code,
-            today_date=self.today_date,
-            product_type=ProductType.Stock,
-            indicator_name=IndicatorName.Boll,
-            product_df_dict=None,
-        )
+        return self._get_indicator(IndicatorName.Boll)
 
     def get_srline(self) -> dict[str, DataFrame]:
-        return dsp.dataPicker.indicator_source_picker(
-            product_code=self.stock_code,
-            today_date=self.today_date,
-            product_type=ProductType.Stock,
-            indicator_name=IndicatorName.SRLine,
-            product_df_dict=None,
-        )
+        return self._get_indicator(IndicatorName.SRLine)
 
     def get_rsi(self) -> dict[str, DataFrame]:
-        return dsp.dataPicker.indicator_source_picker(
+        return self._get_indicator(IndicatorName.RSI)
+
+    def _get_indicator(self, indicator_name: IndicatorName) -> dict[str, DataFrame]:
+        # 通过缓存获取，同一只股票的K线只读取一次
+        return data_cache.indicator_df_dict(
             product_code=self.stock_code,
             today_date=self.today_date,
             product_type=ProductType.Stock,
-            indicator_name=IndicatorName.RSI,
-            product_df_dict=None,
+            indicator_name=indicator_name,
         )
@@ -0,0 +1,8 @@
+"""测试的公共设置：本目录位于utils下，将utils的上级目录加入sys.path，与各模块__main__中的做法一致"""
+
+import os
+import sys
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
@@ -0,0 +1,49 @@
+"""VectorBacktester的回测检查，周K线判断值使用仓库中自带的002230分析结果"""
+
+from utils.backtester import VectorBacktester
+
+import os
+
+import numpy as np
+import pandas as pd
+
+ANALYSIS_CSV = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "002230_SRLine_pressure_area_strategy_anlysis.csv",
+)
+
+
+def load_002230() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """002230的判断值，以及同一交易日历上的随机游走收盘价"""
+    df_judge = pd.read_csv(ANALYSIS_CSV, index_col=0, parse_dates=True)
+    rng = np.random.default_rng(0)
+    ohlc_df = pd.DataFrame(
+        {"收盘": 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(df_judge))))},
+        index=df_judge.index,
+    )
+    return df_judge, ohlc_df
+
+
+def test_weekly_judge_is_held_between_weekly_bars():
+    df_judge, ohlc_df = load_002230()
+    backtester = VectorBacktester()
+    _, df_summary = backtester.run(df_judge, ohlc_df)
+    # 周K线的判断值一周最多调仓一次，换手不应远高于日K线
+    assert df_summary.loc["weekly", "turnover"] <= df_summary.loc["daily", "turnover"]
+    assert df_summary.loc["weekly", "cost"] < 0.05
+
+    weekly_signal = VectorBacktester.hold_period_signal(
+        df_judge["weekly"], pd.DatetimeIndex(ohlc_df.index), "weekly"
+    )
+    week = ohlc_df.index.to_period("W-SUN")
+    # 同一周内（周K线日期之后）仓位不变：每周最多在周末那一天变化
+    changes = weekly_signal.diff().fillna(0.0).ne(0.0)
+    assert changes.groupby(week).sum().max() <= 1
+    week_end = ohlc_df.index.to_series().groupby(week).transform("max")
+    assert not changes[ohlc_df.index != week_end].any()
+
+
+def test_return_across_suspension_is_kept():
+    backtester = VectorBacktester(fee_rate=0.0, stamp_duty=0.0)
+    result = backtester.simulate(np.array([10, 10, np.nan, 12, 12.0]), np.ones(5))
+    np.testing.assert_allclose(result["equity"].ravel(), [1, 1, 1, 1.2, 1.2])
@@ -0,0 +1,19 @@
+"""入口模块的冷启动导入耗时检查，超过预算或在启动时导入了重量级模块时测试失败"""
+
+from utils.import_budget import DEFAULT_BUDGET_SECONDS, measure_import
+
+import os
+
+import utils
+
+# goInvest_app.py所在的目录，即utils的上级目录
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(utils.__file__)))
+
+
+def test_goInvest_app_import_budget():
+    budget_seconds = float(
+        os.environ.get("GOINVEST_IMPORT_BUDGET", DEFAULT_BUDGET_SECONDS)
+    )
+    result = measure_import("goInvest_app", BASE_PATH)
+    assert result["loaded"] == []
+    assert result["seconds"] <= budget_seconds
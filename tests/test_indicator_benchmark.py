@@ -0,0 +1,10 @@
+"""基准测试的冒烟测试：offline_mode()中的替身函数与MyIndicator的接口保持一致"""
+
+from utils.indicator_benchmark import run_benchmarks
+
+
+def test_run_benchmarks_smoke(tmp_path):
+    results = run_benchmarks(base_path=str(tmp_path), bar_sizes=[1000], repeat=1)
+    assert results
+    assert all(seconds >= 0 for seconds in results.values())
+    assert any(name.endswith("analyze[1000bars]") for name in results)
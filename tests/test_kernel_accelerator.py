@@ -0,0 +1,90 @@
+"""kernel_accelerator中各内核的一致性检查：编译版（安装了numba时）、NumPy版与Python参考实现"""
+
+from pandas import Series
+from utils.cross_detector import CrossDetector
+from utils.kernel_accelerator import (
+    DISABLE_JIT_ENV,
+    JitKernel,
+    _met_line_state_numpy,
+    check_parity,
+    met_line_state,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def random_events(n_bars: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """随机的支撑线、阻力线交叉事件，包含同一天与两线都交叉的情况"""
+    rng = np.random.default_rng(seed)
+    return rng.random(n_bars) < 0.05, rng.random(n_bars) < 0.05
+
+
+def events_with_nan_lines(n_bars: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """由含缺失值的支撑/阻力线检测出的交叉事件，缺失值覆盖开头的预热期和中间的一段"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2015-01-01", periods=n_bars)
+    close = Series(10 + np.cumsum(rng.normal(0, 0.2, n_bars)), index=index)
+    support = close.rolling(20).min().shift(1)
+    resistance = close.rolling(20).max().shift(1)
+    support.iloc[300:340] = np.nan
+    resistance.iloc[300:340] = np.nan
+    return (
+        CrossDetector.cross_mask(support, close),
+        CrossDetector.cross_mask(resistance, close),
+    )
+
+
+@pytest.mark.parametrize("initial_state", [0, 1, 2])
+@pytest.mark.parametrize("make_events", [random_events, events_with_nan_lines])
+def test_met_line_state_matches_reference(make_events, initial_state):
+    support_event, resistance_event = make_events(2000, seed=initial_state)
+    assert check_parity(met_line_state, support_event, resistance_event, initial_state)
+    np.testing.assert_array_equal(
+        _met_line_state_numpy(support_event, resistance_event, initial_state),
+        met_line_state.py_func(support_event, resistance_event, initial_state),
+    )
+
+
+def test_met_line_state_chunked_equals_single_pass():
+    support_event, resistance_event = random_events(5000, seed=7)
+    single_pass = met_line_state(support_event, resistance_event, 0)
+    chunks = []
+    state = 0
+    for start in range(0, len(support_event), 333):
+        chunk = met_line_state(
+            support_event[start : start + 333],
+            resistance_event[start : start + 333],
+            state,
+        )
+        chunks.append(chunk)
+        state = int(chunk[-1])
+    np.testing.assert_array_equal(np.concatenate(chunks), single_pass)
+
+
+def test_met_line_state_empty_input():
+    empty = np.zeros(0, dtype=bool)
+    assert len(met_line_state(empty, empty, 1)) == 0
+    assert len(_met_line_state_numpy(empty, empty, 1)) == 0
+
+
+def test_disable_jit_uses_fallback(monkeypatch):
+    monkeypatch.setenv(DISABLE_JIT_ENV, "1")
+    kernel = JitKernel(met_line_state.py_func, _met_line_state_numpy)
+    assert kernel.backend == "numpy"
+    support_event, resistance_event = random_events(500, seed=3)
+    assert check_parity(kernel, support_event, resistance_event, 0)
+
+
+def test_compiled_kernel_matches_fallback(monkeypatch):
+    pytest.importorskip("numba")
+    monkeypatch.delenv(DISABLE_JIT_ENV, raising=False)
+    kernel = JitKernel(met_line_state.py_func, _met_line_state_numpy)
+    assert kernel.backend == "numba"
+    for make_events in (random_events, events_with_nan_lines):
+        support_event, resistance_event = make_events(2000, seed=11)
+        np.testing.assert_array_equal(
+            kernel(support_event, resistance_event, 2),
+            _met_line_state_numpy(support_event, resistance_event, 2),
+        )
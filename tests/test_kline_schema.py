@@ -0,0 +1,23 @@
+"""normalize_kline的列类型检查：停牌K线的成交量缺失，非价格数值列保持精度"""
+
+from utils.kline_schema import normalize_kline
+
+import numpy as np
+import pandas as pd
+
+
+def test_normalize_kline_fills_missing_volume_and_keeps_amount_float64():
+    df = pd.DataFrame(
+        {
+            "收盘": [10.0, np.nan, 11.0],
+            "成交量": [100, np.nan, 300],
+            "成交额": [1234567891.23, np.nan, 5.0],
+        },
+        index=pd.date_range("2020-01-01", periods=3),
+    )
+    result = normalize_kline(df)
+    assert result["收盘"].dtype == np.float32
+    assert result["成交量"].dtype == np.int64
+    assert result["成交量"].tolist() == [100, 0, 300]
+    assert result["成交额"].dtype == np.float64
+    assert result["成交额"].iloc[0] == 1234567891.23
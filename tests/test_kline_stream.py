@@ -0,0 +1,118 @@
+"""kline_stream的分块计算与整段计算一致性检查，收盘价中包含缺失值"""
+
+from utils.cross_detector import CrossDetector
+from utils.kline_stream import (
+    RollingWindowState,
+    SharedSeriesStats,
+    StreamingSMA,
+    StreamingSRLine,
+    run_stream,
+)
+from utils.mySRLine import MySRLine
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_close_with_gaps(n_bars: int = 3000, seed: int = 0) -> pd.DataFrame:
+    """随机游走的收盘价，中间有单独一根和连续几根缺失的K线"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.1, n_bars))
+    close[1234] = np.nan
+    close[2000:2003] = np.nan
+    return pd.DataFrame(
+        {"收盘": close},
+        index=pd.date_range("2020-01-01", periods=n_bars, freq="min", name="日期"),
+    )
+
+
+def test_shared_stats_match_pandas_rolling_with_nan():
+    values = make_close_with_gaps()["收盘"].to_numpy()
+    stats = SharedSeriesStats(values)
+    for window in (3, 20, 250):
+        expected = pd.Series(values).rolling(window)
+        np.testing.assert_allclose(
+            stats.rolling_mean(window), expected.mean().to_numpy(), equal_nan=True
+        )
+        np.testing.assert_allclose(
+            stats.rolling_std(window),
+            expected.std().to_numpy(),
+            atol=1e-8,
+            equal_nan=True,
+        )
+
+
+def test_shared_stats_recover_after_nan():
+    values = np.arange(30.0)
+    values[10] = np.nan
+    np.testing.assert_allclose(
+        SharedSeriesStats(values).rolling_mean(3)[26:29], [25.0, 26.0, 27.0]
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 97, 1000])
+def test_streaming_sma_chunked_equals_single_pass(chunk_size):
+    df = make_close_with_gaps()
+    single_pass = run_stream(df, StreamingSMA(), chunk_size=len(df))
+    chunked = run_stream(df, StreamingSMA(), chunk_size=chunk_size)
+    assert single_pass.isna().sum().tolist() == chunked.isna().sum().tolist()
+    np.testing.assert_allclose(
+        chunked.to_numpy(), single_pass.to_numpy(), equal_nan=True
+    )
+
+    expected = pd.DataFrame(
+        {
+            column: df["收盘"].rolling(int(column)).mean()
+            for column in single_pass.columns
+        }
+    )
+    np.testing.assert_allclose(
+        single_pass.to_numpy(), expected.to_numpy(), equal_nan=True
+    )
+
+
+def test_rolling_window_state_mean_std_across_chunks():
+    values = make_close_with_gaps()["收盘"].to_numpy()
+    state = RollingWindowState(20)
+    means, stds = zip(
+        *(
+            state.mean_std(values[start : start + 333])
+            for start in range(0, len(values), 333)
+        )
+    )
+    expected = pd.Series(values).rolling(20)
+    np.testing.assert_allclose(
+        np.concatenate(means), expected.mean().to_numpy(), equal_nan=True
+    )
+    np.testing.assert_allclose(
+        np.concatenate(stds), expected.std().to_numpy(), equal_nan=True
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [97, 1000])
+def test_streaming_srline_chunked_equals_batch_with_nan_gap(chunk_size):
+    df = make_close_with_gaps()
+    close = df["收盘"]
+    # 与批量计算的walk_forward模式相同：滚动拟合支撑/阻力线，再做压力区判断
+    df_srline = MySRLine._fit_srline_walk_forward(close, threshold=0.05, window=250)
+    batch_judge = MySRLine._pressure_area_judge(
+        closing_price=close.to_numpy(dtype=float),
+        support_line=df_srline["支撑线"].to_numpy(dtype=float),
+        resistance_line=df_srline["阻力线"].to_numpy(dtype=float),
+        support_event=CrossDetector.cross_mask(df_srline["支撑线"], close),
+        resistance_event=CrossDetector.cross_mask(df_srline["阻力线"], close),
+        area_num=20,
+    )
+
+    streamed = run_stream(df, StreamingSRLine(250, 0.05, 20), chunk_size=chunk_size)
+    np.testing.assert_allclose(
+        streamed[["支撑线", "阻力线"]].to_numpy(),
+        df_srline.to_numpy(),
+        equal_nan=True,
+    )
+    np.testing.assert_array_equal(streamed["判断值"].to_numpy(), batch_judge)
+    # 支撑/阻力线缺失的K线没有判断
+    missing = df_srline.isna().any(axis=1).to_numpy()
+    assert missing[2000:2003].all()
+    assert (streamed["判断值"].to_numpy()[missing] == 0).all()
@@ -0,0 +1,27 @@
+"""面板中判断值的记录与筛选：float32的判断值记入面板后仍能按==筛选"""
+
+from utils.screener import PanelRecorder, Screener, strategy_column
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def test_float32_judges_are_recorded_exactly(tmp_path):
+    panel_stem = os.path.join(str(tmp_path), "screener_panel")
+    recorder = PanelRecorder(panel_stem)
+    index = pd.date_range("2020-01-01", periods=2)
+    for product_code, judge in (("000001", 0.25), ("000002", 0.6), ("000003", -1)):
+        df_judge = pd.DataFrame(
+            {"daily": np.array([0, judge], dtype=np.float32)}, index=index
+        )
+        recorder.record_strategy(product_code, "SRLine", "_area", df_judge)
+    recorder.flush()
+
+    column = strategy_column("SRLine", "_area", "daily")
+    screener = Screener(panel_stem=panel_stem)
+    assert screener.panel.loc["000001", column] == 0.25
+    assert screener.panel.loc["000002", column] == 0.6
+    assert list(screener.select((column, "==", 0.25)).index) == ["000001"]
+    assert list(screener.query(f"`{column}` == 0.6").index) == ["000002"]